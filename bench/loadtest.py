@@ -0,0 +1,313 @@
+"""Load test for the four master routers.
+
+Seeds each table through its bulk endpoint, drives the list, detail, create,
+update and delete endpoints at a fixed concurrency and writes p50/p95/p99
+latency, throughput and allocations per request to a JSON file. With
+``--baseline`` the run is compared against an earlier result file and the
+exit code is 1 when a scenario regressed by more than ``--threshold``.
+
+Run from the repository root against a disposable database, e.g.:
+
+    DATABASE_URL=postgresql+asyncpg://postgres@localhost/bench \\
+        python -m bench.loadtest --create-tables --rows 10000 --out bench/results.json
+
+Without ``--url`` the app is driven in-process (no network, allocations are
+measured); with ``--url`` a running server is load tested instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# Router -> (collection path, name column in the request body, ID column in the response)
+ROUTERS: Dict[str, Tuple[str, str, str]] = {
+    "modifiers": ("/modifiers/modifiers", "modifier", "modifier_id"),
+    "nounvalue": ("/nounvalue/nounvalue", "noun", "noun_id"),
+    "attributename": ("/attributename/attributename", "modifier", "modifier_id"),
+    "attributevalue": ("/attributevalue/attributevalue", "noun", "noun_id"),
+}
+
+SCENARIOS = ("list", "detail", "create", "update", "delete")
+
+# For disposable databases only; the columns the routers read and write
+CREATE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS {table} (
+        {id_field} VARCHAR PRIMARY KEY,
+        {name_field} VARCHAR,
+        abbreviation VARCHAR,
+        description VARCHAR,
+        isActive BOOLEAN
+    );""".format(table=table, id_field=id_field, name_field=name_field)
+    for table, id_field, name_field in (
+        ("modifier_name_mstr", "modifier_id", "modifier"),
+        ("noun_value_mstr", "noun_id", "noun"),
+        ("attri_name_mstr", "modifier_id", "modifier"),
+        ("attri_value_mstr", "noun_id", "noun"),
+    )
+]
+
+SEED_CHUNK = 1000
+
+
+def _row(name_field: str, n: int) -> Dict[str, Any]:
+    return {
+        name_field: f"BENCH {n:07d}",
+        "abbreviation": f"B{n % 1000:03d}",
+        "description": f"benchmark row {n}",
+        "isActive": n % 10 != 0,
+    }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Run:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.seeded: Dict[str, List[str]] = {}
+        self.created: Dict[str, List[str]] = {}
+
+    async def seed(self, router: str):
+        path, name_field, _ = ROUTERS[router]
+        ids: List[str] = []
+        for start in range(0, self.args.rows, SEED_CHUNK):
+            rows = [_row(name_field, n) for n in range(start, min(start + SEED_CHUNK, self.args.rows))]
+            response = await self.client.post(f"{path}/bulk", json=rows)
+            response.raise_for_status()
+            ids.extend(i for i in response.json()["ids"] if i)
+        self.seeded[router] = ids
+        self.created[router] = []
+
+    async def cleanup(self, router: str):
+        path = ROUTERS[router][0]
+        ids = self.seeded.get(router, []) + self.created.get(router, [])
+        for start in range(0, len(ids), SEED_CHUNK):
+            await self.client.post(f"{path}/bulk/delete", json={"ids": ids[start:start + SEED_CHUNK]})
+
+    def request_factory(self, router: str, scenario: str) -> Tuple[int, Callable[[int], Any]]:
+        """Returns the number of requests to send and a coroutine factory for request ``i``."""
+        path, name_field, id_field = ROUTERS[router]
+        seeded = self.seeded[router]
+        client = self.client
+        rnd = random.Random(self.args.seed)
+
+        if scenario == "list":
+            def make(i):
+                # Random pages so the response cache does not serve every request
+                after = rnd.choice(seeded) if self.args.random_pages else None
+                params = {"limit": self.args.page_size}
+                if after:
+                    params["after"] = after
+                return client.get(path, params=params)
+            return self.args.requests, make
+        if scenario == "detail":
+            return self.args.requests, lambda i: client.get(f"{path}/{rnd.choice(seeded)}")
+        if scenario == "create":
+            async def create(i):
+                response = await client.post(path, json=_row(name_field, self.args.rows + i))
+                if response.status_code == 200:
+                    self.created[router].append(response.json()["data"][0][id_field])
+                return response
+            return self.args.requests, create
+        if scenario == "update":
+            def update(i):
+                n = rnd.randrange(self.args.rows)
+                return client.put(f"{path}/{rnd.choice(seeded)}", json=_row(name_field, n))
+            return self.args.requests, update
+        if scenario == "delete":
+            # Deletes the rows made by the create scenario
+            created = self.created[router]
+            to_delete, self.created[router] = created[:], []
+            return len(to_delete), lambda i: client.delete(f"{path}/{to_delete[i]}")
+        raise ValueError(scenario)
+
+    async def drive(self, count: int, make: Callable[[int], Any]) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors = 0
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < count:
+                i = next_index
+                next_index += 1
+                start = time.perf_counter()
+                response = await make(i)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "requests": count,
+            "errors": errors,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        }
+
+    async def allocations(self, make: Callable[[int], Any], samples: int) -> Dict[str, Any]:
+        """Peak bytes and retained memory blocks per request, measured one request at a time."""
+        tracemalloc.start()
+        peaks, blocks = [], []
+        try:
+            for i in range(samples):
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                blocks_before = sys.getallocatedblocks()
+                await make(i)
+                _, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                blocks.append(sys.getallocatedblocks() - blocks_before)
+        finally:
+            tracemalloc.stop()
+        return {
+            "alloc_peak_kib": round(statistics.fmean(peaks) / 1024, 2) if peaks else 0.0,
+            "alloc_retained_blocks": round(statistics.fmean(blocks), 1) if blocks else 0.0,
+        }
+
+    async def scenario(self, router: str, scenario: str) -> Dict[str, Any]:
+        count, make = self.request_factory(router, scenario)
+        warmup = min(self.args.warmup, count) if scenario in ("list", "detail", "update") else 0
+        for i in range(warmup):
+            await make(i)
+        result = await self.drive(count, make)
+        if self.args.url is None and self.args.alloc_samples and scenario in ("list", "detail", "update"):
+            result.update(await self.allocations(make, self.args.alloc_samples))
+        return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lists the scenarios whose p95 latency or throughput got worse than the baseline by more than threshold."""
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+async def _create_tables():
+    import database
+    from sqlalchemy import text
+    async with database.init_engine().begin() as conn:
+        for statement in CREATE_TABLES:
+            await conn.execute(text(statement))
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.url is None:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+        lifespan = app.router.lifespan_context(app)
+    else:
+        transport, base_url, lifespan = None, args.url, None
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "mode": "in-process" if args.url is None else args.url,
+            "rows": args.rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "page_size": args.page_size,
+        },
+        "results": {},
+    }
+
+    async def run_all():
+        if args.create_tables:
+            await _create_tables()
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+            run = Run(client, args)
+            for router in args.routers:
+                await run.seed(router)
+                try:
+                    for scenario in args.scenarios:
+                        result = await run.scenario(router, scenario)
+                        results["results"][f"{router}.{scenario}"] = result
+                        print(f"{router}.{scenario}: {json.dumps(result)}")
+                finally:
+                    if not args.keep:
+                        await run.cleanup(router)
+
+    if lifespan is not None:
+        async with lifespan:
+            await run_all()
+    else:
+        await run_all()
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Base URL of a running server; default drives the app in-process")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows seeded into each table")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed requests before each read scenario")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--random-pages", action=argparse.BooleanOptionalAction, default=True,
+                        help="Start list requests at random cursors instead of always the first page")
+    parser.add_argument("--alloc-samples", type=int, default=100,
+                        help="Sequential requests measured with tracemalloc (in-process only, 0 to skip)")
+    parser.add_argument("--routers", nargs="+", choices=list(ROUTERS), default=list(ROUTERS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1, help="Random seed, for reproducible request sequences")
+    parser.add_argument("--create-tables", action="store_true", help="Create the master tables if missing")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows instead of deleting them")
+    parser.add_argument("--out", default="bench/results.json")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging, 0.10 = 10%%")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,71 @@
+"""Memory of an in-memory table snapshot vs the same rows as Pydantic objects.
+
+Builds synthetic rows shaped like a master table (unique IDs and names,
+abbreviations and descriptions drawn from a small vocabulary) and measures,
+with tracemalloc, a TableSnapshot of them and a list of the response models
+the detail endpoint would build. No database is needed:
+
+    python -m bench.snapshot --rows 100000
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import create_model
+
+from listing import KeysetLister
+from snapshot import TableSnapshot
+
+TABLE, ID_FIELD, NAME_FIELD = "noun_value_mstr", "noun_id", "noun"
+
+
+def _rows(count: int, vocabulary: int) -> List[tuple]:
+    # New string objects per row, as the driver returns them
+    return [(f"N_{i:06d}", f"NOUN {i}", f"AB{i % vocabulary}", f"description {i % vocabulary}",
+             i % 10 != 0) for i in range(count)]
+
+
+def _measure(build: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main(args: argparse.Namespace) -> int:
+    lister = KeysetLister(TABLE, ID_FIELD, NAME_FIELD)
+    ResponseData = create_model(
+        "NounValueResponseData",
+        **{ID_FIELD: (str, ...), NAME_FIELD: (str, ...)}, abbreviation=(str, ...), description=(str, ...),
+        isActive=(bool, ...)
+    )
+    results: Dict[str, Dict[str, Optional[int]]] = {}
+    # Each build gets fresh rows, so neither side shares the other's strings
+    results["snapshot"] = {"bytes": _measure(lambda: TableSnapshot(lister, 1, _rows(args.rows, args.vocabulary)))}
+    results["pydantic"] = {"bytes": _measure(lambda: [
+        ResponseData(**dict(zip(lister.fields, row))) for row in _rows(args.rows, args.vocabulary)])}
+    for name, result in results.items():
+        result["bytes_per_100k_rows"] = result["bytes"] * 100000 // args.rows
+        print(f"{name:9} {result['bytes'] / 2 ** 20:8.1f} MiB  {result['bytes_per_100k_rows'] / 2 ** 20:8.1f} MiB per 100k rows")
+    print(f"snapshot / pydantic: {results['snapshot']['bytes'] / results['pydantic']['bytes']:.2f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=200, help="Distinct abbreviations and descriptions")
+    parser.add_argument("--out", help="Write the sizes to this JSON file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
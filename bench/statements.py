@@ -0,0 +1,116 @@
+"""Per-query cost of ad-hoc text() statements vs the precompiled, typed ones.
+
+Runs the by-ID and list queries of one master table back to back on a single
+connection, three ways:
+
+- adhoc: ``text(sql)`` built per call, asyncpg statement cache off
+  (every call is parsed and planned by Postgres)
+- adhoc+cache: ``text(sql)`` per call, statement cache on
+- precompiled: the statements of master_query/listing, statement cache on
+
+Run from the repository root, e.g.:
+
+    DATABASE_URL=postgresql+asyncpg://postgres@localhost/bench python -m bench.statements --iterations 5000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database
+from listing import KeysetLister, ListParams
+from master_query import GET_BY_ID, compile_statements
+
+TABLE, ID_FIELD, NAME_FIELD = "noun_value_mstr", "noun_id", "noun"
+LIST_SQL = f'SELECT {ID_FIELD} AS "{ID_FIELD}", {NAME_FIELD} AS "{NAME_FIELD}", abbreviation, description, ' \
+           f'isActive AS "isActive" FROM {TABLE} WHERE (length({ID_FIELD}), {ID_FIELD}) > (length(:after), :after) ' \
+           f'ORDER BY length({ID_FIELD}), {ID_FIELD} LIMIT :limit'
+
+
+def _list_params(after: str, limit: int) -> ListParams:
+    return ListParams(after=after, limit=limit, isActive=None, name=None, abbreviation=None, fields=None)
+
+
+async def _measure(conn, make: Callable[[], Any], bind: Callable[[], Dict[str, Any]], iterations: int,
+                   warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        (await conn.execute(make(), bind())).fetchall()
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        (await conn.execute(make(), bind())).fetchall()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "mean_us": round(statistics.fmean(timings) * 1e6, 1),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1] * 1e6, 1),
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    engines = {
+        "adhoc": create_async_engine(args.database_url, connect_args={"prepared_statement_cache_size": 0}),
+        "cached": create_async_engine(args.database_url, connect_args={
+            "prepared_statement_cache_size": database.DB_STATEMENT_CACHE_SIZE or 100}),
+    }
+    statements = compile_statements(TABLE, ID_FIELD, NAME_FIELD)
+    lister = KeysetLister(TABLE, ID_FIELD, NAME_FIELD)
+    by_id_sql = GET_BY_ID.format(table=TABLE, id_field=ID_FIELD, name_field=NAME_FIELD)
+    results: Dict[str, Dict[str, Dict[str, float]]] = {"by_id": {}, "list": {}}
+    try:
+        async with engines["cached"].connect() as conn:
+            row = (await conn.execute(text(f"SELECT {ID_FIELD} FROM {TABLE} ORDER BY {ID_FIELD} LIMIT 1"))).first()
+        if row is None:
+            print(f"{TABLE} is empty; seed it first (e.g. python -m bench.loadtest --keep)", file=sys.stderr)
+            return 1
+        item_id = row[0]
+        by_id_bind = lambda: {"id": item_id}
+        # The same binds fit the ad-hoc list SQL: first page, one extra row
+        _, list_bind = lister.build_query(_list_params("", args.page_size))
+
+        cases = [
+            ("adhoc", "adhoc", lambda: text(by_id_sql), lambda: text(LIST_SQL)),
+            ("adhoc+cache", "cached", lambda: text(by_id_sql), lambda: text(LIST_SQL)),
+            ("precompiled", "cached", lambda: statements.get_by_id,
+             lambda: lister.build_query(_list_params("", args.page_size))[0]),
+        ]
+        for name, engine, make_by_id, make_list in cases:
+            async with engines[engine].connect() as conn:
+                results["by_id"][name] = await _measure(conn, make_by_id, by_id_bind, args.iterations, args.warmup)
+                results["list"][name] = await _measure(conn, make_list, lambda: list_bind, args.iterations, args.warmup)
+    finally:
+        for engine in engines.values():
+            await engine.dispose()
+
+    for query, by_case in results.items():
+        baseline = by_case["adhoc"]["mean_us"]
+        for name, timing in by_case.items():
+            saving = round(100 * (baseline - timing["mean_us"]) / baseline, 1) if baseline else 0.0
+            timing["saving_pct"] = saving
+            print(f"{query:6} {name:12} mean {timing['mean_us']:>8} us  p50 {timing['p50_us']:>8} us  "
+                  f"p99 {timing['p99_us']:>8} us  saving {saving:>5}%")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=database.DATABASE_URL)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--out", help="Write the timings to this JSON file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from cache import get_cache
+from id_allocator import get_allocator
+from listing import KeysetLister
+from versioning import bump_version, forget_version
+
+# Rows written (and committed) per statement
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+
+class BulkRowError(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: str
+
+
+class BulkResponse(BaseModel):
+    message: str
+    created: int
+    updated: int
+    # IDs in input order, None for rows that were rejected
+    ids: List[Optional[str]]
+    errors: List[BulkRowError]
+
+
+class BulkFilter(BaseModel):
+    isActive: Optional[bool] = None
+    name: Optional[str] = None
+    abbreviation: Optional[str] = None
+
+
+class BulkSelection(BaseModel):
+    """Rows to act on: an explicit ID list, a filter, or both (rows must match both)."""
+    ids: Optional[List[str]] = None
+    filter: Optional[BulkFilter] = None
+
+
+class BulkActiveSelection(BulkSelection):
+    isActive: bool
+
+
+class BulkChangeResponse(BaseModel):
+    message: str
+    ids: List[str]
+    # Requested IDs that did not match any row
+    not_found: List[str]
+
+
+async def read_bulk_rows(request: Request, id_field: str) -> List[Dict[str, Any]]:
+    """Parses a JSON array, NDJSON or CSV request body into row dicts."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    body = await request.body()
+    try:
+        body = body.decode("utf-8")
+        if content_type == "text/csv":
+            rows = list(csv.DictReader(io.StringIO(body)))
+            # CSV cannot tell a missing ID (a new row) from an empty one; other empty columns stay empty strings
+            for row in rows:
+                if row.get(id_field) == "":
+                    row[id_field] = None
+            return rows
+        if content_type in ("application/x-ndjson", "application/jsonl"):
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        rows = json.loads(body)
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {str(e)}")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of rows.")
+    return rows
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+class BulkWriter:
+    """Set-based writes for one master table.
+
+    upsert() writes rows with one INSERT ... ON CONFLICT per chunk. Rows without
+    an ID get one from the table's allocator (reserved in a single call); rows
+    that carry an existing ID update it. The chunk is sent as one array per
+    column and expanded with unnest(), so a chunk is a single round trip
+    regardless of its size. delete() and set_active() change every selected
+    row with a single statement.
+    """
+
+    def __init__(self, table: str, id_field: str, name_field: str, create_model: Type[BaseModel]):
+        self.table = table
+        self.id_field = id_field
+        self.name_field = name_field
+        self.create_model = create_model
+        self._lister = KeysetLister(table, id_field, name_field)
+        self.upsert_query = text(f"""
+            INSERT INTO {table} ({id_field}, {name_field}, abbreviation, description, isActive)
+            SELECT * FROM unnest(
+                CAST(:ids AS TEXT[]), CAST(:names AS TEXT[]), CAST(:abbreviations AS TEXT[]),
+                CAST(:descriptions AS TEXT[]), CAST(:active AS BOOLEAN[])
+            )
+            ON CONFLICT ({id_field}) DO UPDATE
+            SET {name_field} = EXCLUDED.{name_field},
+                abbreviation = EXCLUDED.abbreviation,
+                description = EXCLUDED.description,
+                isActive = EXCLUDED.isActive
+            RETURNING {id_field}, (xmax = 0) AS inserted;
+        """)
+
+    def _columns(self, rows: List[Dict[str, Any]]) -> Dict[str, list]:
+        return {
+            "ids": [row[self.id_field] for row in rows],
+            "names": [row[self.name_field] for row in rows],
+            "abbreviations": [row["abbreviation"] for row in rows],
+            "descriptions": [row["description"] for row in rows],
+            "active": [row["isActive"] for row in rows],
+        }
+
+    async def upsert(self, db: AsyncSession, raw_rows: List[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE,
+                     progress: Optional[Callable[[int, int], Awaitable[None]]] = None) -> BulkResponse:
+        """Writes the rows; ``progress(done, total)`` is awaited after every chunk."""
+        ids: List[Optional[str]] = [None] * len(raw_rows)
+        errors: List[BulkRowError] = []
+        valid: List[Dict[str, Any]] = []
+        positions: List[int] = []
+        seen = set()
+
+        for index, raw in enumerate(raw_rows):
+            row_id = raw.get(self.id_field) if isinstance(raw, dict) else None
+            # An empty ID means a new row, as an empty CSV column does
+            row_id = str(row_id) if row_id is not None and row_id != "" else None
+            try:
+                if not isinstance(raw, dict):
+                    raise ValueError("row must be an object")
+                if row_id is not None and row_id in seen:
+                    raise ValueError(f"duplicate {self.id_field} in batch")
+                row = self.create_model(**raw).model_dump()
+            except ValidationError as e:
+                errors.append(BulkRowError(index=index, id=row_id, error=_format_validation_error(e)))
+                continue
+            except ValueError as e:
+                errors.append(BulkRowError(index=index, id=row_id, error=str(e)))
+                continue
+            if row_id is not None:
+                seen.add(row_id)
+            row[self.id_field] = row_id
+            valid.append(row)
+            positions.append(index)
+
+        try:
+            missing = [row for row in valid if row[self.id_field] is None]
+            if missing:
+                new_ids = await get_allocator(self.table).reserve(db, len(missing))
+                for row, new_id in zip(missing, new_ids):
+                    row[self.id_field] = new_id
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+        created = updated = 0
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            chunk_positions = positions[start:start + chunk_size]
+            try:
+                result = await db.execute(self.upsert_query, self._columns(chunk))
+                written = result.fetchall()
+                await bump_version(db, self.table)
+                await db.commit()
+                get_cache(self.table).clear()
+                forget_version(self.table)
+            except SQLAlchemyError:
+                # Retry the failed chunk row by row to find the offending rows
+                await db.rollback()
+                written = []
+                for row, index in zip(chunk, chunk_positions):
+                    try:
+                        async with db.begin_nested():
+                            result = await db.execute(self.upsert_query, self._columns([row]))
+                            written.extend(result.fetchall())
+                    except SQLAlchemyError as e:
+                        error = str(getattr(e, "orig", None) or e)
+                        errors.append(BulkRowError(index=index, id=row[self.id_field], error=error))
+                if written:
+                    await bump_version(db, self.table)
+                await db.commit()
+                get_cache(self.table).clear()
+                forget_version(self.table)
+
+            written_ids = {row_id: inserted for row_id, inserted in written}
+            for row, index in zip(chunk, chunk_positions):
+                if row[self.id_field] in written_ids:
+                    ids[index] = row[self.id_field]
+                    if written_ids[row[self.id_field]]:
+                        created += 1
+                    else:
+                        updated += 1
+            if progress is not None:
+                await progress(start + len(chunk), len(valid))
+
+        errors.sort(key=lambda error: error.index)
+        return BulkResponse(message="success", created=created, updated=updated, ids=ids, errors=errors)
+
+    def _where(self, selection: BulkSelection):
+        conditions, bind = [], {}
+        if selection.filter is not None:
+            conditions, bind = self._lister.filter_conditions(
+                selection.filter.isActive, selection.filter.name, selection.filter.abbreviation)
+        if selection.ids is not None:
+            conditions.append(f"{self.id_field} = ANY(CAST(:ids AS TEXT[]))")
+            bind["ids"] = selection.ids
+        if not conditions:
+            raise HTTPException(status_code=400, detail="Provide ids or at least one filter.")
+        return " AND ".join(conditions), bind
+
+    async def _change(self, db: AsyncSession, query: str, bind: Dict[str, Any],
+                      selection: BulkSelection) -> BulkChangeResponse:
+        try:
+            result = await db.execute(text(query), bind)
+            changed = [row[0] for row in result.fetchall()]
+            if changed:
+                await bump_version(db, self.table)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if changed:
+            get_cache(self.table).clear()
+            forget_version(self.table)
+        found = set(changed)
+        not_found = [row_id for row_id in dict.fromkeys(selection.ids or []) if row_id not in found]
+        return BulkChangeResponse(message="success", ids=changed, not_found=not_found)
+
+    async def delete(self, db: AsyncSession, selection: BulkSelection) -> BulkChangeResponse:
+        where, bind = self._where(selection)
+        query = f"DELETE FROM {self.table} WHERE {where} RETURNING {self.id_field};"
+        return await self._change(db, query, bind, selection)
+
+    async def set_active(self, db: AsyncSession, selection: BulkActiveSelection) -> BulkChangeResponse:
+        where, bind = self._where(selection)
+        bind["new_active"] = selection.isActive
+        query = f"UPDATE {self.table} SET isActive = :new_active WHERE {where} RETURNING {self.id_field};"
+        return await self._change(db, query, bind, selection)
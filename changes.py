@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import BigInteger, Integer, bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from database import get_db
+from listing import KeysetLister
+from metrics import TimedRoute
+from settings import env_bool
+
+logger = logging.getLogger(__name__)
+
+CHANGES_DEFAULT_LIMIT = int(os.getenv("CHANGES_DEFAULT_LIMIT", "1000"))
+CHANGES_MAX_LIMIT = int(os.getenv("CHANGES_MAX_LIMIT", "10000"))
+# Changes older than this are pruned; clients that fall further behind must resync (0 keeps everything)
+CHANGES_RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", "30"))
+CHANGES_PRUNE_INTERVAL = float(os.getenv("CHANGES_PRUNE_INTERVAL", "3600"))
+# Create the changelog table and the master table triggers on startup; turn off where the schema is managed by the DBA
+CHANGES_INSTALL_TRIGGERS = env_bool("CHANGES_INSTALL_TRIGGERS", "true")
+
+CHANGES_TABLE = "master_changes"
+# Notified (with the table name) by every write, for the push stream
+CHANGES_CHANNEL = "master_changes"
+
+# One row per created, updated or deleted master row, written by statement
+# level triggers, so bulk writes and writes made outside the API are recorded
+# too, with one INSERT per statement rather than per row.
+ENSURE_CHANGES_TABLE = f"""
+    DO $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('{CHANGES_TABLE}'));
+        CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+            change_id BIGSERIAL PRIMARY KEY,
+            tx_id BIGINT NOT NULL DEFAULT txid_current(),
+            table_name TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            row_id TEXT NOT NULL,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS {CHANGES_TABLE}_tx_idx ON {CHANGES_TABLE} (tx_id, change_id);
+        CREATE INDEX IF NOT EXISTS {CHANGES_TABLE}_changed_at_idx ON {CHANGES_TABLE} (changed_at);
+        CREATE OR REPLACE FUNCTION {CHANGES_TABLE}_record() RETURNS trigger LANGUAGE plpgsql AS $f$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                EXECUTE format('INSERT INTO {CHANGES_TABLE} (table_name, operation, row_id) SELECT %L, %L, %I FROM old_rows',
+                               TG_TABLE_NAME, 'delete', TG_ARGV[0]);
+            ELSE
+                EXECUTE format('INSERT INTO {CHANGES_TABLE} (table_name, operation, row_id) SELECT %L, %L, %I FROM new_rows',
+                               TG_TABLE_NAME, CASE TG_OP WHEN 'INSERT' THEN 'create' ELSE 'update' END, TG_ARGV[0]);
+            END IF;
+            -- Sent on commit, once per table and transaction
+            PERFORM pg_notify('{CHANGES_CHANNEL}', TG_TABLE_NAME);
+            RETURN NULL;
+        END $f$;
+        {{triggers}}
+    END $$;
+"""
+
+ENSURE_TRIGGERS = """
+        IF to_regclass('{table}') IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM pg_trigger WHERE tgrelid = '{table}'::regclass AND tgname = '{table}_changes_insert'
+        ) THEN
+            CREATE TRIGGER {table}_changes_insert AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION {changes}_record('{id_field}');
+            CREATE TRIGGER {table}_changes_update AFTER UPDATE ON {table} REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION {changes}_record('{id_field}');
+            CREATE TRIGGER {table}_changes_delete AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION {changes}_record('{id_field}');
+        END IF;
+"""
+
+# Changes are ordered by transaction ID and only returned once every older
+# transaction has finished (tx_id below the snapshot's xmin). A change ID alone
+# is not a safe cursor: IDs are handed out at insert time, so a transaction
+# that commits late can add changes below a cursor a client already holds.
+GET_CHANGES = text(f"""
+    SELECT change_id, tx_id, table_name, operation, row_id, changed_at
+    FROM {CHANGES_TABLE}
+    WHERE (tx_id, change_id) > (:tx_id, :change_id)
+      AND tx_id < txid_snapshot_xmin(txid_current_snapshot())
+      AND table_name = ANY(CAST(:tables AS TEXT[]))
+    ORDER BY tx_id, change_id
+    LIMIT :limit;
+""").bindparams(
+    bindparam("tx_id", type_=BigInteger()), bindparam("change_id", type_=BigInteger()),
+    bindparam("limit", type_=Integer()),
+)
+
+CURRENT_TOKEN = text(f"""
+    SELECT tx_id, change_id
+    FROM {CHANGES_TABLE}
+    WHERE tx_id < txid_snapshot_xmin(txid_current_snapshot())
+    ORDER BY tx_id DESC, change_id DESC
+    LIMIT 1;
+""")
+
+TOKEN_EXISTS = text(f"SELECT 1 FROM {CHANGES_TABLE} WHERE change_id = :change_id;").bindparams(
+    bindparam("change_id", type_=BigInteger()))
+
+PRUNE_CHANGES = text(f"DELETE FROM {CHANGES_TABLE} WHERE changed_at < now() - make_interval(secs => :seconds);")
+
+
+class Change(BaseModel):
+    table: str
+    id: str
+    operation: Literal["create", "update", "delete"]
+    # Change ID of the latest change to the row in this response
+    version: int
+    # Resume point right after this change
+    token: str
+    changed_at: datetime
+    # The row as it is now; None for deletes (tombstones)
+    data: Optional[Dict[str, Any]] = None
+
+
+class ChangesResponse(BaseModel):
+    message: str
+    changes: List[Change]
+    # Pass as `since` to get the changes after these
+    next_since: str
+    has_more: bool
+
+
+_ready = False
+_tables: Dict[str, KeysetLister] = {}
+router = APIRouter(route_class=TimedRoute)
+
+
+def register_change_table(lister: KeysetLister):
+    _tables[lister.table] = lister
+
+
+async def ensure_changelog():
+    """Creates the changelog table and the triggers of every registered table, unless CHANGES_INSTALL_TRIGGERS is off."""
+    global _ready
+    if _ready:
+        return
+    if CHANGES_INSTALL_TRIGGERS:
+        triggers = "".join(ENSURE_TRIGGERS.format(table=lister.table, id_field=lister.id_field, changes=CHANGES_TABLE)
+                           for lister in _tables.values())
+        async with database.init_engine().begin() as conn:
+            await conn.execute(text(ENSURE_CHANGES_TABLE.replace("{triggers}", triggers)))
+    _ready = True
+
+
+async def maintain_changelog():
+    """Installs the changelog triggers, then prunes old changes periodically; runs in the background."""
+    while True:
+        try:
+            await ensure_changelog()
+            if CHANGES_RETENTION_DAYS:
+                async with database.init_engine().begin() as conn:
+                    await conn.execute(PRUNE_CHANGES, {"seconds": CHANGES_RETENTION_DAYS * 86400})
+        except (SQLAlchemyError, OSError) as e:
+            # e.g. the database is not up yet; the app keeps serving meanwhile
+            logger.warning("Changelog maintenance failed: %s", e)
+        # Until the triggers are installed, retry soon
+        await asyncio.sleep(CHANGES_PRUNE_INTERVAL if _ready else 5)
+
+
+def _token(tx_id: int, change_id: int) -> str:
+    return f"{tx_id}-{change_id}"
+
+
+def parse_token(since: str) -> Tuple[int, int]:
+    try:
+        tx_id, change_id = since.split("-")
+        return int(tx_id), int(change_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed since token.")
+
+
+def check_tables(tables: Optional[List[str]]):
+    unknown = [table for table in tables or [] if table not in _tables]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown)}")
+
+
+async def check_token(db: AsyncSession, since: str):
+    """Rejects tokens whose following changes were already pruned."""
+    _, change_id = parse_token(since)
+    if change_id and (await db.execute(TOKEN_EXISTS, {"change_id": change_id})).first() is None:
+        raise HTTPException(status_code=410, detail="Changes since this token were pruned; resync the tables.")
+
+
+async def _current_rows(db: AsyncSession, table: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    lister = _tables[table]
+    columns = ", ".join(f'{f} AS "{f}"' for f in lister.fields)
+    result = await db.execute(text(f"SELECT {columns} FROM {table} WHERE {lister.id_field} = ANY(CAST(:ids AS TEXT[]))"),
+                              {"ids": ids})
+    return {row[0]: lister.to_item(row) for row in result}
+
+
+async def current_token(db: AsyncSession) -> str:
+    row = (await db.execute(CURRENT_TOKEN)).first()
+    return _token(*row) if row else _token(0, 0)
+
+
+async def fetch_changes(db: AsyncSession, since: str, tables: Optional[List[str]], limit: int) -> ChangesResponse:
+    """The changes after ``since``, each row once at its latest change; shared by GET /changes and the push stream."""
+    tx_id, change_id = parse_token(since)
+    rows = (await db.execute(GET_CHANGES, {
+        "tx_id": tx_id, "change_id": change_id, "tables": tables or list(_tables), "limit": limit + 1,
+    })).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Only the latest change per row matters to a client catching up
+    latest: Dict[Tuple[str, str], Any] = {}
+    for row in rows:
+        latest.pop((row.table_name, row.row_id), None)
+        latest[(row.table_name, row.row_id)] = row
+    by_table: Dict[str, List[str]] = {}
+    for table, row_id in latest:
+        by_table.setdefault(table, []).append(row_id)
+    current = {table: await _current_rows(db, table, ids) for table, ids in by_table.items()}
+
+    changes = []
+    for (table, row_id), row in latest.items():
+        data = current[table].get(row_id)
+        # A row deleted after the change was recorded is reported as deleted
+        operation = row.operation if data is not None else "delete"
+        changes.append(Change(table=table, id=row_id, operation=operation, version=row.change_id,
+                              token=_token(row.tx_id, row.change_id), changed_at=row.changed_at,
+                              data=data if operation != "delete" else None))
+    next_since = _token(rows[-1].tx_id, rows[-1].change_id) if rows else since
+    return ChangesResponse(message="success", changes=changes, next_since=next_since, has_more=has_more)
+
+
+# Delta sync: the creates, updates and deletes after `since`. Without `since`
+# only the current token is returned; take it before the initial full pull.
+@router.get("/changes", response_model=ChangesResponse)
+async def get_changes(
+    since: Optional[str] = None,
+    tables: Optional[List[str]] = Query(None),
+    limit: int = Query(CHANGES_DEFAULT_LIMIT, ge=1, le=CHANGES_MAX_LIMIT),
+    db: AsyncSession = Depends(get_db)
+):
+    check_tables(tables)
+    try:
+        await ensure_changelog()
+        if since is None:
+            return ChangesResponse(message="success", changes=[], next_since=await current_token(db), has_more=False)
+        await check_token(db, since)
+        return await fetch_changes(db, since, tables, limit)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,199 @@
+import gzip
+import os
+import zlib
+from functools import lru_cache
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+
+from serialization import as_response
+from settings import env_bool
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSION_ENABLED = env_bool("COMPRESSION_ENABLED", "true")
+# Smaller bodies are sent as they are; compressing them saves less than it costs
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Levels for responses compressed per request; cached payloads are compressed
+# once per table version, so they use the slower, smaller STORED_LEVELS
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+STORED_LEVELS = {"br": 9, "gzip": 9}
+
+# In order of preference when the client accepts several equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Streamed event by event; compression would hold events back in the encoder
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The preferred encoding the client accepts, or None for identity."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY if level is None else level)
+    # mtime=0 keeps the output the same for the same input
+    return gzip.compress(data, COMPRESSION_GZIP_LEVEL if level is None else level, mtime=0)
+
+
+class _Encoder:
+    """Incremental compressor for streamed bodies; every chunk is flushed so it reaches the client."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._gzip = None
+        else:
+            self._brotli = None
+            # wbits 31 writes the gzip container
+            self._gzip = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def write(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._gzip.compress(data) + self._gzip.flush()
+
+
+def _compressible(headers: Headers, status: int) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    return (
+        status not in (204, 206, 304)
+        and "content-encoding" not in headers
+        and "content-range" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+    )
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """ASGI middleware that gzip or brotli compresses responses the client accepts.
+
+    Whole bodies are compressed when they reach COMPRESSION_MIN_SIZE; streamed
+    bodies (exports, job results) are compressed chunk by chunk. Responses that
+    already carry a Content-Encoding, such as the precompressed list pages,
+    pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        start = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if encoder is not None:
+                await send({"type": "http.response.body", "more_body": more_body,
+                            "body": encoder.write(body) if more_body else encoder.finish(body)})
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            if not _compressible(headers, start["status"]) or (not more_body and len(body) < COMPRESSION_MIN_SIZE):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers["content-encoding"] = encoding
+            _add_vary(headers)
+            # Byte ranges of the uncompressed body no longer apply
+            if "accept-ranges" in headers:
+                del headers["accept-ranges"]
+            if more_body:
+                encoder = _Encoder(encoding)
+                if "content-length" in headers:
+                    del headers["content-length"]
+                body = encoder.write(body)
+            else:
+                body = compress(body, encoding)
+                headers["content-length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class Payload:
+    """Encoded JSON cached together with its compressed variants.
+
+    A repeat request for a cached page gets the bytes for its encoding as
+    they are; each variant is compressed on first use and lives as long as
+    the cache entry, i.e. until the table version changes.
+    """
+
+    __slots__ = ("body", "_compressed")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._compressed: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._compressed.get(encoding)
+        if data is None:
+            data = self._compressed[encoding] = compress(self.body, encoding, STORED_LEVELS[encoding])
+        return data
+
+
+def payload_response(payload: Payload, request: Request, response: Optional[Response] = None) -> Response:
+    """Sends a cached payload in the client's encoding, with the headers set on ``response``."""
+    encoding = None
+    if COMPRESSION_ENABLED and len(payload.body) >= COMPRESSION_MIN_SIZE:
+        encoding = negotiate(request.headers.get("accept-encoding", ""))
+    raw = as_response(payload.encoded(encoding) if encoding else payload.body, response)
+    if encoding:
+        raw.headers["content-encoding"] = encoding
+    _add_vary(raw.headers)
+    return raw
@@ -0,0 +1,258 @@
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from bulk import BulkChangeResponse
+from cache import get_cache
+from compression import Payload, payload_response
+from database import get_db
+from metrics import TimedRoute
+from replicas import get_read_db, reads_from_primary
+from serialization import dumps
+from versioning import bump_version, forget_version, get_version, not_modified_response
+
+LINKS_TABLE = "master_hierarchy_links"
+
+# Parent -> child links between the levels of the classification tree. The
+# parent table of a link is the level above its child_table.
+ENSURE_LINKS_TABLE = f"""
+    DO $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('{LINKS_TABLE}'));
+        CREATE TABLE IF NOT EXISTS {LINKS_TABLE} (
+            child_table TEXT NOT NULL,
+            parent_id TEXT NOT NULL,
+            child_id TEXT NOT NULL,
+            PRIMARY KEY (child_table, parent_id, child_id)
+        );
+    END $$;
+"""
+
+
+class HierarchyLevel(NamedTuple):
+    name: str
+    table: str
+    id_field: str
+    name_field: str
+    children_key: Optional[str]
+
+
+# Root first: noun -> modifier -> attribute name -> attribute value
+LEVELS = [
+    HierarchyLevel("noun", "noun_value_mstr", "noun_id", "noun", "modifiers"),
+    HierarchyLevel("modifier", "modifier_name_mstr", "modifier_id", "modifier", "attribute_names"),
+    HierarchyLevel("attribute_name", "attri_name_mstr", "modifier_id", "modifier", "attribute_values"),
+    HierarchyLevel("attribute_value", "attri_value_mstr", "noun_id", "noun", None),
+]
+LEVEL_INDEX = {level.name: i for i, level in enumerate(LEVELS)}
+# Columns selected per level, in this order
+NODE_COLUMNS = 5
+
+
+class HierarchyLinks(BaseModel):
+    level: Literal["modifier", "attribute_name", "attribute_value"]
+    parent_id: str
+    child_ids: List[str]
+
+
+def _tree_query(one_noun: bool, active_only: bool) -> str:
+    """One LEFT JOIN chain over all levels; every row is a path from a noun down to its deepest linked node."""
+    columns, joins, order = [], [], []
+    for i, level in enumerate(LEVELS):
+        alias = f"t{i}"
+        columns += [f"{alias}.{level.id_field}", f"{alias}.{level.name_field}", f"{alias}.abbreviation",
+                    f"{alias}.description", f"{alias}.isActive"]
+        order.append(f"length({alias}.{level.id_field}), {alias}.{level.id_field}")
+        if i == 0:
+            continue
+        parent = LEVELS[i - 1]
+        joins.append(f"LEFT JOIN {LINKS_TABLE} l{i} ON l{i}.child_table = '{level.table}' "
+                     f"AND l{i}.parent_id = t{i - 1}.{parent.id_field}")
+        condition = f"{alias}.{level.id_field} = l{i}.child_id"
+        if active_only:
+            condition += f" AND COALESCE({alias}.isActive, TRUE)"
+        joins.append(f"LEFT JOIN {level.table} {alias} ON {condition}")
+    where = []
+    if one_noun:
+        where.append(f"t0.{LEVELS[0].id_field} = :noun_id")
+    if active_only:
+        where.append("COALESCE(t0.isActive, TRUE)")
+    return (f"SELECT {', '.join(columns)} FROM {LEVELS[0].table} t0 {' '.join(joins)} "
+            f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {', '.join(order)}")
+
+
+# Built once for the four combinations of subtree/whole tree and active filter
+_TREE_QUERIES = {(one, active): text(_tree_query(one, active)) for one in (False, True) for active in (False, True)}
+
+
+def _node(level: HierarchyLevel, row, offset: int) -> Dict[str, Any]:
+    is_active = row[offset + 4]
+    node = {
+        level.id_field: row[offset],
+        level.name_field: row[offset + 1] if row[offset + 1] is not None else "",
+        "abbreviation": row[offset + 2] if row[offset + 2] is not None else "",
+        "description": row[offset + 3] if row[offset + 3] is not None else "",
+        "isActive": is_active if isinstance(is_active, bool) else True,
+    }
+    if level.children_key:
+        node[level.children_key] = []
+    return node
+
+
+def build_tree(rows) -> List[Dict[str, Any]]:
+    """Folds the flat, path-ordered rows into nested nodes."""
+    roots: Dict[Any, Dict[str, Any]] = {}
+    # Children already added under a node, by node identity
+    children: Dict[int, Dict[Any, Dict[str, Any]]] = {}
+    for row in rows:
+        siblings, parent = roots, None
+        for i, level in enumerate(LEVELS):
+            offset = i * NODE_COLUMNS
+            node_id = row[offset]
+            if node_id is None:
+                break
+            node = siblings.get(node_id)
+            if node is None:
+                node = siblings[node_id] = _node(level, row, offset)
+                if parent is not None:
+                    parent[LEVELS[i - 1].children_key].append(node)
+            siblings = children.setdefault(id(node), {})
+            parent = node
+    return list(roots.values())
+
+
+_ready = False
+hierarchy_cache = get_cache("hierarchy")
+router = APIRouter(route_class=TimedRoute)
+
+
+async def ensure_links_table():
+    global _ready
+    if not _ready:
+        async with database.init_engine().begin() as conn:
+            await conn.execute(text(ENSURE_LINKS_TABLE))
+        _ready = True
+
+
+async def _tree_version(db: AsyncSession, fresh: bool) -> str:
+    # The tree changes with any of the master tables or the links
+    versions = [await get_version(db, level.table, fresh) for level in LEVELS]
+    versions.append(await get_version(db, LINKS_TABLE, fresh))
+    return ".".join(str(v) for v in versions)
+
+
+async def _tree(request: Request, response: Response, db: AsyncSession, noun_id: Optional[str], active_only: bool):
+    try:
+        await ensure_links_table()
+        version = await _tree_version(db, reads_from_primary(request))
+        not_modified = not_modified_response(request, response, "hierarchy", version)
+        if not_modified is not None:
+            return not_modified
+        cache_key = (version, noun_id, active_only)
+        body = hierarchy_cache.get(cache_key)
+        if body is None:
+            generation = hierarchy_cache.generation
+            bind = {"noun_id": noun_id} if noun_id is not None else {}
+            result = await db.execute(_TREE_QUERIES[(noun_id is not None, active_only)], bind)
+            tree = build_tree(result.fetchall())
+            if noun_id is not None and not tree:
+                raise HTTPException(status_code=404, detail="Noun not found.")
+            body = Payload(dumps({"message": "success", "data": tree}))
+            hierarchy_cache.set(cache_key, body, generation)
+        return payload_response(body, request, response)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Whole classification tree: nouns with their modifiers, attribute names and values
+@router.get("/hierarchy")
+async def get_hierarchy(request: Request, response: Response, active_only: bool = Query(False),
+                        db: AsyncSession = Depends(get_read_db)):
+    return await _tree(request, response, db, None, active_only)
+
+
+# Subtree of one noun
+@router.get("/hierarchy/{noun_id}")
+async def get_noun_hierarchy(noun_id: str, request: Request, response: Response, active_only: bool = Query(False),
+                             db: AsyncSession = Depends(get_read_db)):
+    return await _tree(request, response, db, noun_id, active_only)
+
+
+def _link_statements(links: HierarchyLinks) -> Tuple[str, str]:
+    child = LEVELS[LEVEL_INDEX[links.level]]
+    parent = LEVELS[LEVEL_INDEX[links.level] - 1]
+    parent_exists = f"SELECT 1 FROM {parent.table} WHERE {parent.id_field} = :parent_id"
+    link = f"""
+        WITH found AS (
+            SELECT {child.id_field} AS id FROM {child.table} WHERE {child.id_field} = ANY(CAST(:child_ids AS TEXT[]))
+        ), linked AS (
+            INSERT INTO {LINKS_TABLE} (child_table, parent_id, child_id)
+            SELECT :child_table, :parent_id, id FROM found
+            ON CONFLICT DO NOTHING
+        )
+        SELECT id FROM found
+    """
+    return parent_exists, link
+
+
+async def _links_changed(db: AsyncSession):
+    await bump_version(db, LINKS_TABLE)
+    await db.commit()
+    hierarchy_cache.clear()
+    forget_version(LINKS_TABLE)
+
+
+# Links children (e.g. modifiers) to a parent one level up (e.g. a noun)
+@router.post("/hierarchy/links", response_model=BulkChangeResponse)
+async def add_hierarchy_links(links: HierarchyLinks, db: AsyncSession = Depends(get_db)):
+    try:
+        await ensure_links_table()
+        parent_exists, link = _link_statements(links)
+        if (await db.execute(text(parent_exists), {"parent_id": links.parent_id})).first() is None:
+            raise HTTPException(status_code=404, detail="Parent not found.")
+        result = await db.execute(text(link), {
+            "child_table": LEVELS[LEVEL_INDEX[links.level]].table,
+            "parent_id": links.parent_id,
+            "child_ids": links.child_ids,
+        })
+        found = {row[0] for row in result}
+        await _links_changed(db)
+        return BulkChangeResponse(
+            message="success",
+            ids=[i for i in links.child_ids if i in found],
+            not_found=[i for i in links.child_ids if i not in found],
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/hierarchy/links/delete", response_model=BulkChangeResponse)
+async def delete_hierarchy_links(links: HierarchyLinks, db: AsyncSession = Depends(get_db)):
+    try:
+        await ensure_links_table()
+        result = await db.execute(text(f"""
+            DELETE FROM {LINKS_TABLE}
+            WHERE child_table = :child_table AND parent_id = :parent_id
+              AND child_id = ANY(CAST(:child_ids AS TEXT[]))
+            RETURNING child_id
+        """), {
+            "child_table": LEVELS[LEVEL_INDEX[links.level]].table,
+            "parent_id": links.parent_id,
+            "child_ids": links.child_ids,
+        })
+        removed = {row[0] for row in result}
+        await _links_changed(db)
+        return BulkChangeResponse(
+            message="success",
+            ids=[i for i in links.child_ids if i in removed],
+            not_found=[i for i in links.child_ids if i not in removed],
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,122 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from sqlalchemy import text
+
+import database
+
+# IDs reserved from the sequence per round trip, only used when the sequence is first created
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+# Minimum number of digits in generated IDs (M_0001)
+ID_PAD_WIDTH = int(os.getenv("ID_PAD_WIDTH", "4"))
+
+
+# Creates the backing sequence once, seeded past the highest existing numeric suffix.
+# The advisory lock keeps concurrent workers from racing on the CREATE.
+ENSURE_SEQUENCE = """
+    DO $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('{sequence}'));
+        IF to_regclass('{sequence}') IS NULL THEN
+            EXECUTE format(
+                'CREATE SEQUENCE {sequence} INCREMENT BY %s START WITH %s',
+                {block_size},
+                (SELECT COALESCE(MAX(CAST(substring({id_column} FROM '[0-9]+$') AS BIGINT)), 0) + 1
+                 FROM {table})
+            );
+        END IF;
+    END $$;
+"""
+
+GET_SEQUENCE_INCREMENT = """
+    SELECT increment_by
+    FROM pg_sequences
+    WHERE sequencename = :sequence;
+"""
+
+RESERVE_BLOCKS = "SELECT nextval('{sequence}') FROM generate_series(1, :blocks);"
+
+
+class IdAllocator(ABC):
+    """Hands out new primary keys for a master table."""
+
+    @abstractmethod
+    async def reserve(self, db, count: int) -> List[str]:
+        """Returns ``count`` new IDs."""
+
+    async def next_id(self, db) -> str:
+        return (await self.reserve(db, 1))[0]
+
+
+class SequenceIdAllocator(IdAllocator):
+    """Allocates IDs from a Postgres sequence whose increment is the block size.
+
+    Every nextval() reserves a whole block of numbers for this process, which
+    are then handed out from memory, so inserts normally need no extra round
+    trip and IDs stay unique across concurrent requests and worker processes.
+    """
+
+    def __init__(self, prefix: str, table: str, id_column: str,
+                 block_size: int = ID_BLOCK_SIZE, pad_width: int = ID_PAD_WIDTH):
+        self.prefix = prefix
+        self.table = table
+        self.id_column = id_column
+        self.sequence = f"{table}_{id_column}_seq"
+        self.block_size = block_size
+        self.pad_width = pad_width
+        self._ready = False
+        self._ranges: Deque[Tuple[int, int]] = deque()
+        self._lock = asyncio.Lock()
+        self._reserve_blocks = text(RESERVE_BLOCKS.format(sequence=self.sequence))
+
+    def format_id(self, number: int) -> str:
+        return f"{self.prefix}_{number:0{self.pad_width}d}"
+
+    async def ensure(self):
+        # Runs in its own transaction so a request that rolls back cannot undo the CREATE
+        async with database.init_engine().begin() as conn:
+            await conn.execute(text(ENSURE_SEQUENCE.format(
+                sequence=self.sequence, table=self.table,
+                id_column=self.id_column, block_size=self.block_size,
+            )))
+            # An existing sequence keeps the increment it was created with
+            result = await conn.execute(text(GET_SEQUENCE_INCREMENT), {"sequence": self.sequence})
+            self.block_size = result.scalar()
+        self._ready = True
+
+    async def _refill(self, db, count: int):
+        blocks = -(-count // self.block_size)
+        result = await db.execute(self._reserve_blocks, {"blocks": blocks})
+        for (start,) in result.fetchall():
+            self._ranges.append((start, start + self.block_size))
+
+    async def reserve(self, db, count: int) -> List[str]:
+        numbers: List[int] = []
+        async with self._lock:
+            if not self._ready:
+                await self.ensure()
+            while len(numbers) < count:
+                if not self._ranges:
+                    await self._refill(db, count - len(numbers))
+                start, end = self._ranges.popleft()
+                take = min(end - start, count - len(numbers))
+                numbers.extend(range(start, start + take))
+                if start + take < end:
+                    self._ranges.appendleft((start + take, end))
+        return [self.format_id(number) for number in numbers]
+
+
+# Allocators by table name, so a deployment can swap in its own implementation
+_allocators: Dict[str, IdAllocator] = {}
+
+
+def register_allocator(table: str, allocator: IdAllocator) -> IdAllocator:
+    _allocators[table] = allocator
+    return allocator
+
+
+def get_allocator(table: str) -> IdAllocator:
+    return _allocators[table]
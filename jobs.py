@@ -0,0 +1,423 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Literal, NamedTuple, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from bulk import BULK_CHUNK_SIZE, BulkWriter, read_bulk_rows
+from export import MEDIA_TYPES, export_to_file
+from listing import KeysetLister
+from metrics import TimedRoute
+from settings import env_bool
+
+logger = logging.getLogger(__name__)
+
+# Jobs run concurrently; each holds at most one connection of its own pool,
+# so jobs never take connections from the request pool
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs waiting for a worker; submissions beyond this get a 503
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# Finished jobs (and their result files) kept per process
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "500"))
+# Mirrors job status to a table so any worker process can answer polls
+JOB_PERSIST = env_bool("JOB_PERSIST", "false")
+JOB_RESULT_DIR = os.getenv("JOB_RESULT_DIR", os.path.join(tempfile.gettempdir(), "material-jobs"))
+
+JOBS_TABLE = "background_jobs"
+
+ENSURE_JOBS_TABLE = f"""
+    DO $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('{JOBS_TABLE}'));
+        CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            params JSONB NOT NULL,
+            done BIGINT NOT NULL DEFAULT 0,
+            total BIGINT,
+            result JSONB,
+            error TEXT,
+            created_at TIMESTAMPTZ NOT NULL,
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ
+        );
+    END $$;
+"""
+
+SAVE_JOB = text(f"""
+    INSERT INTO {JOBS_TABLE} (id, kind, status, params, done, total, result, error, created_at, started_at, finished_at)
+    VALUES (:id, :kind, :status, CAST(:params AS JSONB), :done, :total, CAST(:result AS JSONB), :error,
+            :created_at, :started_at, :finished_at)
+    ON CONFLICT (id) DO UPDATE
+    SET status = EXCLUDED.status,
+        done = EXCLUDED.done,
+        total = EXCLUDED.total,
+        result = EXCLUDED.result,
+        error = EXCLUDED.error,
+        started_at = EXCLUDED.started_at,
+        finished_at = EXCLUDED.finished_at;
+""")
+
+JOB_COLUMNS = "id, kind, status, params, done, total, result, error, created_at, started_at, finished_at"
+GET_JOB = text(f"SELECT {JOB_COLUMNS} FROM {JOBS_TABLE} WHERE id = :id;").columns(params=JSONB, result=JSONB)
+LIST_JOBS = text(f"SELECT {JOB_COLUMNS} FROM {JOBS_TABLE} ORDER BY created_at DESC LIMIT :limit;").columns(
+    params=JSONB, result=JSONB)
+
+# Progress is written to the jobs table at most this often
+PERSIST_INTERVAL = 1.0
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobProgress(BaseModel):
+    done: int
+    # None while the total is unknown (exports)
+    total: Optional[int] = None
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    params: Dict[str, Any]
+    progress: JobProgress
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobTable(NamedTuple):
+    bulk: BulkWriter
+    lister: KeysetLister
+
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any], run: Callable[["Job"], Awaitable[Dict[str, Any]]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.run = run
+        self.status = "queued"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        # Set by the job when it writes a downloadable result
+        self.result_path: Optional[str] = None
+        self.media_type = "application/json"
+        self.task: Optional[asyncio.Task] = None
+        self._saved_at = 0.0
+
+    def status_model(self) -> JobStatus:
+        return JobStatus(
+            id=self.id, kind=self.kind, status=self.status, params=self.params,
+            progress=JobProgress(done=self.done, total=self.total), result=self.result, error=self.error,
+            created_at=self.created_at, started_at=self.started_at, finished_at=self.finished_at,
+        )
+
+    async def progress(self, done: int, total: Optional[int] = None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        if time.monotonic() - self._saved_at >= PERSIST_INTERVAL:
+            await _save(self)
+
+
+_ready = False
+_tables: Dict[str, JobTable] = {}
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+# Jobs have their own engine: pool_size=JOB_WORKERS and no overflow bound
+# their connection use no matter how many jobs are queued
+_engine: Optional[AsyncEngine] = None
+_SessionLocal: Optional[sessionmaker] = None
+
+router = APIRouter(route_class=TimedRoute)
+
+
+def register_job_table(table: str, bulk: BulkWriter, lister: KeysetLister) -> JobTable:
+    _tables[table] = JobTable(bulk, lister)
+    return _tables[table]
+
+
+def _job_table(table: str) -> JobTable:
+    if table not in _tables:
+        raise HTTPException(status_code=400, detail=f"Unknown table: {table}")
+    return _tables[table]
+
+
+async def _write(job: Job):
+    if not JOB_PERSIST or _engine is None:
+        return
+    job._saved_at = time.monotonic()
+    async with _engine.begin() as conn:
+        await conn.execute(SAVE_JOB, {
+            "id": job.id, "kind": job.kind, "status": job.status, "params": json.dumps(job.params),
+            "done": job.done, "total": job.total,
+            "result": json.dumps(job.result) if job.result is not None else None, "error": job.error,
+            "created_at": job.created_at, "started_at": job.started_at, "finished_at": job.finished_at,
+        })
+
+
+async def _save(job: Job):
+    # Progress and outcome are best effort; the job itself carries on
+    try:
+        await _write(job)
+    except (SQLAlchemyError, OSError) as e:
+        logger.warning("Could not save the status of job %s: %s", job.id, e)
+
+
+def _row_status(row) -> JobStatus:
+    return JobStatus(
+        id=row.id, kind=row.kind, status=row.status, params=row.params,
+        progress=JobProgress(done=row.done, total=row.total), result=row.result, error=row.error,
+        created_at=row.created_at, started_at=row.started_at, finished_at=row.finished_at,
+    )
+
+
+def _forget_old_jobs():
+    finished = [job for job in _jobs.values() if job.status in FINISHED]
+    for job in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+        del _jobs[job.id]
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+
+
+async def _execute(job: Job):
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+    await _save(job)
+    try:
+        job.result = await job.run(job)
+        job.status = "succeeded"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    except HTTPException as e:
+        job.status, job.error = "failed", str(e.detail)
+    except Exception as e:
+        logger.exception("Job %s failed", job.id)
+        job.status, job.error = "failed", str(e)
+    finally:
+        # Drops the closure and whatever it holds, e.g. the rows of an import
+        job.run = None
+        job.finished_at = datetime.now(timezone.utc)
+        await _save(job)
+        _forget_old_jobs()
+
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        try:
+            if job.status != "queued":
+                # Cancelled while it waited
+                continue
+            job.task = asyncio.create_task(_execute(job))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                # The job was cancelled; the worker only stops on shutdown
+                if asyncio.current_task().cancelling():
+                    raise
+        finally:
+            _queue.task_done()
+
+
+def start_jobs():
+    global _queue, _engine, _SessionLocal
+    if _workers:
+        return
+    os.makedirs(JOB_RESULT_DIR, exist_ok=True)
+    _engine = database.build_engine(database.DATABASE_URL, "jobs", pool_size=JOB_WORKERS, max_overflow=0)
+    _SessionLocal = database.make_sessionmaker(_engine)
+    _queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(JOB_WORKERS))
+
+
+async def stop_jobs():
+    """Cancels the workers; running jobs end up cancelled."""
+    global _queue, _engine, _SessionLocal
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    for job in _jobs.values():
+        if job.status == "queued":
+            job.status = "cancelled"
+            await _save(job)
+    if _engine is not None:
+        await _engine.dispose()
+    _queue, _engine, _SessionLocal = None, None, None
+
+
+async def _ensure_jobs_table():
+    global _ready
+    if JOB_PERSIST and not _ready:
+        async with _engine.begin() as conn:
+            await conn.execute(text(ENSURE_JOBS_TABLE))
+        _ready = True
+
+
+async def _submit(kind: str, params: Dict[str, Any], run: Callable[[Job], Awaitable[Dict[str, Any]]]) -> JobStatus:
+    if _queue is None:
+        start_jobs()
+    if _queue.full():
+        raise HTTPException(status_code=503, detail="Job queue is full.", headers={"Retry-After": "30"})
+    job = Job(kind, params, run)
+    # Recorded before it is queued, so a job that runs always has a status to poll
+    try:
+        await _ensure_jobs_table()
+        await _write(job)
+    except (SQLAlchemyError, OSError) as e:
+        raise HTTPException(status_code=503, detail=f"Could not record the job: {str(e)}",
+                            headers={"Retry-After": "30"})
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        # Filled up by other submissions meanwhile
+        job.status, job.finished_at = "cancelled", datetime.now(timezone.utc)
+        await _save(job)
+        raise HTTPException(status_code=503, detail="Job queue is full.", headers={"Retry-After": "30"})
+    _jobs[job.id] = job
+    return job.status_model()
+
+
+def _result_file(job: Job, extension: str) -> str:
+    return os.path.join(JOB_RESULT_DIR, f"{job.id}.{extension}")
+
+
+def _write_text(path: str, content: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+# Bulk upsert of a JSON array, NDJSON or CSV body, as POST /{table}/bulk;
+# the full BulkResponse is the job's result file
+@router.post("/jobs/import", response_model=JobStatus, status_code=202)
+async def submit_import(
+    request: Request,
+    table: str,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=10000)
+):
+    bulk = _job_table(table).bulk
+    rows = await read_bulk_rows(request, bulk.id_field)
+
+    async def run(job: Job) -> Dict[str, Any]:
+        job.total = len(rows)
+        async with _SessionLocal() as db:
+            response = await bulk.upsert(db, rows, chunk_size, job.progress)
+        job.result_path = _result_file(job, "json")
+        await asyncio.to_thread(_write_text, job.result_path, response.model_dump_json())
+        return {"created": response.created, "updated": response.updated, "errors": len(response.errors)}
+
+    return await _submit("import", {"table": table, "chunk_size": chunk_size, "rows": len(rows)}, run)
+
+
+@router.post("/jobs/export", response_model=JobStatus, status_code=202)
+async def submit_export(table: str, format: Literal["ndjson", "csv"] = "ndjson", isActive: Optional[bool] = None):
+    lister = _job_table(table).lister
+
+    async def run(job: Job) -> Dict[str, Any]:
+        job.result_path = _result_file(job, format)
+        job.media_type = MEDIA_TYPES[format]
+        rows = await export_to_file(lister, format, job.result_path, isActive, _engine, job.progress)
+        return {"rows": rows}
+
+    return await _submit("export", {"table": table, "format": format, "isActive": isActive}, run)
+
+
+# Rebuilds the indexes (without blocking writes) and refreshes the planner statistics
+@router.post("/jobs/reindex", response_model=JobStatus, status_code=202)
+async def submit_reindex(tables: Optional[List[str]] = Query(None)):
+    for table in tables or []:
+        _job_table(table)
+    selected = tables or list(_tables)
+
+    async def run(job: Job) -> Dict[str, Any]:
+        job.total = len(selected)
+        async with _engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for done, table in enumerate(selected, 1):
+                await conn.execute(text(f"REINDEX TABLE CONCURRENTLY {table};"))
+                await conn.execute(text(f"ANALYZE {table};"))
+                await job.progress(done)
+        return {"tables": selected}
+
+    return await _submit("reindex", {"tables": selected}, run)
+
+
+@router.get("/jobs", response_model=List[JobStatus])
+async def list_jobs(limit: int = Query(100, ge=1, le=1000)):
+    if JOB_PERSIST and _engine is not None:
+        try:
+            async with _engine.connect() as conn:
+                return [_row_status(row) for row in await conn.execute(LIST_JOBS, {"limit": limit})]
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return [job.status_model() for job in reversed(_jobs.values())][:limit]
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job.status_model()
+    if JOB_PERSIST and _engine is not None:
+        try:
+            async with _engine.connect() as conn:
+                row = (await conn.execute(GET_JOB, {"id": job_id})).first()
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if row is not None:
+            return _row_status(row)
+    raise HTTPException(status_code=404, detail="Job not found.")
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None:
+        # Result files stay with the process that ran the job
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status != "succeeded" or job.result_path is None:
+        raise HTTPException(status_code=409, detail=f"Job has no result (status: {job.status}).")
+    return FileResponse(job.result_path, media_type=job.media_type,
+                        filename=f"{job.kind}-{job.id}{os.path.splitext(job.result_path)[1]}")
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.now(timezone.utc)
+        await _save(job)
+    elif job.status == "running" and job.task is not None:
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+    return job.status_model()
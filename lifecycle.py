@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import database
+from replicas import replicas
+
+logger = logging.getLogger(__name__)
+
+# Wait before warming up again when the database was unreachable
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+
+class Lifecycle:
+    """Readiness of this worker process.
+
+    The worker is ready once warm_up() has opened its pools' connections and
+    filled the caches, and stops being ready as soon as a shutdown signal
+    arrives, so load balancers move traffic away while the server finishes
+    the requests already in flight. A worker started while the database is
+    unreachable serves requests without being ready, and keeps warming up in
+    the background until it succeeds.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        # Called on the event loop when draining starts, e.g. to end long-lived streams
+        self.on_drain: List[Callable[[], None]] = []
+        self._warmups: List[Callable[[AsyncSession], Awaitable[None]]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._retry: Optional[asyncio.Task] = None
+
+    def register_warmup(self, warm: Callable[[AsyncSession], Awaitable[None]]):
+        self._warmups.append(warm)
+
+    async def warm_up(self):
+        self._loop = asyncio.get_running_loop()
+        if not await self._warm():
+            self._retry = asyncio.create_task(self._retry_warm_up())
+
+    async def _warm(self) -> bool:
+        for engine in [database.init_engine()] + [replica.engine for replica in replicas]:
+            try:
+                await _fill_pool(engine)
+            except (SQLAlchemyError, OSError) as e:
+                # Not fatal: the pool still opens connections on demand
+                logger.warning("Could not warm up the pool of %s: %s", engine.url.render_as_string(hide_password=True), e)
+        warmed = True
+        async with database.SessionLocal() as db:
+            for warm in self._warmups:
+                try:
+                    await warm(db)
+                except (SQLAlchemyError, OSError) as e:
+                    logger.warning("Cache warm-up failed: %s", e)
+                    warmed = False
+                    await db.rollback()
+        if warmed:
+            self.ready = not self.draining
+        return warmed
+
+    async def _retry_warm_up(self):
+        while not self.draining:
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+            if await self._warm():
+                return
+
+    async def stop(self):
+        if self._retry is not None:
+            self._retry.cancel()
+            await asyncio.gather(self._retry, return_exceptions=True)
+            self._retry = None
+
+    def drain(self):
+        if self.draining:
+            return
+        self.draining = True
+        self.ready = False
+        if self._loop is not None:
+            for callback in self.on_drain:
+                self._loop.call_soon_threadsafe(callback)
+
+    def watch_signals(self):
+        """Runs drain() ahead of the server's own handlers of the shutdown signals.
+
+        uvicorn installs its handlers before the lifespan starts, so they are
+        wrapped rather than replaced; uvicorn restores the originals on exit.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+            # Already wrapped when the lifespan runs again under the same handlers (e.g. in tests)
+            if callable(previous) and not getattr(previous, "drains", False):
+                signal.signal(sig, self._signal_handler(previous))
+
+    def _signal_handler(self, previous: Callable) -> Callable:
+        def handler(signum, frame):
+            self.drain()
+            previous(signum, frame)
+        handler.drains = True
+        return handler
+
+
+async def _fill_pool(engine: AsyncEngine):
+    # Held all at once so the pool opens pool_size separate connections, which stay pooled when returned
+    async with AsyncExitStack() as stack:
+        for _ in range(engine.pool.size()):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1,171 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import Boolean, Integer, String, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from serialization import dumps
+
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+
+
+class PageResponse(BaseModel):
+    message: str
+    data: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class ListParams:
+    """Query parameters shared by the list endpoints of every master table."""
+
+    def __init__(
+        self,
+        after: Optional[str] = Query(None, description="Cursor: only return rows whose ID sorts after it"),
+        limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+        isActive: Optional[bool] = Query(None),
+        name: Optional[str] = Query(None, description="Prefix filter on the name column"),
+        abbreviation: Optional[str] = Query(None, description="Prefix filter on the abbreviation"),
+        fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    ):
+        self.after = after
+        self.limit = limit
+        self.isActive = isActive
+        self.name = name
+        self.abbreviation = abbreviation
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    def cache_key(self) -> tuple:
+        return (self.after, self.limit, self.isActive, self.name, self.abbreviation,
+                tuple(self.fields) if self.fields else None)
+
+
+# Types of every bind parameter the list and filter queries use
+BIND_TYPES = {
+    "is_active": Boolean(),
+    "name_prefix": String(),
+    "abbreviation_prefix": String(),
+    "after": String(),
+    "limit": Integer(),
+}
+
+
+def typed_text(query: str, bind_names) -> Any:
+    return text(query).bindparams(*(bindparam(name, type_=BIND_TYPES[name]) for name in bind_names))
+
+
+def like_prefix(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+class KeysetLister:
+    """Builds keyset-paginated list queries for one master table.
+
+    Pages are ordered by the length of the primary key, then the key, and
+    continue after the cursor in that order, so generated IDs keep their
+    numeric order once they outgrow the pad width (M_9999, M_10000). With an
+    index on ``(length(id), id)`` every page is an index range scan no matter
+    how deep the client pages.
+    """
+
+    def __init__(self, table: str, id_field: str, name_field: str):
+        self.table = table
+        self.id_field = id_field
+        self.name_field = name_field
+        self.fields = [id_field, name_field, "abbreviation", "description", "isActive"]
+        # Shorter IDs first: the same order as the numbers in IDs that share a prefix
+        self.order_by = f"length({id_field}), {id_field}"
+        self._mappers: Dict[Tuple[str, ...], Callable] = {}
+        # One statement per field selection and filter combination, so the SQL
+        # text, and with it the driver's prepared statement, is reused
+        self._queries: Dict[tuple, Any] = {}
+
+    def select_fields(self, fields: Optional[List[str]]) -> List[str]:
+        if not fields:
+            return self.fields
+        unknown = [f for f in fields if f not in self.fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # The ID is always returned, it is the cursor
+        return [f for f in self.fields if f == self.id_field or f in fields]
+
+    def filter_conditions(self, is_active: Optional[bool], name: Optional[str],
+                          abbreviation: Optional[str]) -> Tuple[List[str], Dict[str, Any]]:
+        conditions = []
+        bind: Dict[str, Any] = {}
+        if is_active is not None:
+            conditions.append("isActive = :is_active")
+            bind["is_active"] = is_active
+        if name:
+            conditions.append(f"{self.name_field} LIKE :name_prefix")
+            bind["name_prefix"] = like_prefix(name)
+        if abbreviation:
+            conditions.append("abbreviation LIKE :abbreviation_prefix")
+            bind["abbreviation_prefix"] = like_prefix(abbreviation)
+        return conditions, bind
+
+    def build_query(self, params: ListParams) -> Tuple[Any, Dict[str, Any]]:
+        fields = tuple(self.select_fields(params.fields))
+        conditions, bind = self.filter_conditions(params.isActive, params.name, params.abbreviation)
+        bind["limit"] = params.limit + 1
+        if params.after is not None:
+            conditions.append(f"(length({self.id_field}), {self.id_field}) > (length(:after), :after)")
+            bind["after"] = params.after
+        shape = (fields, tuple(bind))
+        query = self._queries.get(shape)
+        if query is None:
+            columns = ", ".join(f'{f} AS "{f}"' for f in fields)
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            query = typed_text(f"SELECT {columns} FROM {self.table} {where} ORDER BY {self.order_by} LIMIT :limit",
+                               bind)
+            self._queries[shape] = query
+        return query, bind
+
+    @staticmethod
+    def to_item(row) -> Dict[str, Any]:
+        item = {}
+        for key, value in row._mapping.items():
+            if key == "isActive":
+                item[key] = value if isinstance(value, bool) else True
+            else:
+                item[key] = value if value is not None else ""
+        return item
+
+    def row_mapper(self, fields: Tuple[str, ...]) -> Callable:
+        """Returns a row -> dict function for a field selection, built once per selection."""
+        mapper = self._mappers.get(fields)
+        if mapper is None:
+            columns = [(name, name == "isActive") for name in fields]
+
+            def mapper(row) -> Dict[str, Any]:
+                return {
+                    name: (value if isinstance(value, bool) else True) if is_flag
+                    else (value if value is not None else "")
+                    for (name, is_flag), value in zip(columns, row)
+                }
+            self._mappers[fields] = mapper
+        return mapper
+
+    async def _fetch_rows(self, db: AsyncSession, params: ListParams):
+        query, bind = self.build_query(params)
+        result = await db.execute(query, bind)
+        rows = result.fetchall()
+        next_cursor = None
+        # One extra row is fetched to tell whether another page exists
+        if len(rows) > params.limit:
+            rows = rows[:params.limit]
+            next_cursor = rows[-1]._mapping[self.id_field]
+        return rows, next_cursor
+
+    async def fetch_page(self, db: AsyncSession, params: ListParams) -> PageResponse:
+        rows, next_cursor = await self._fetch_rows(db, params)
+        return PageResponse(message="success", data=[self.to_item(row) for row in rows], next_cursor=next_cursor)
+
+    async def fetch_page_json(self, db: AsyncSession, params: ListParams) -> bytes:
+        """Same page as fetch_page, encoded straight to JSON without building models."""
+        rows, next_cursor = await self._fetch_rows(db, params)
+        mapper = self.row_mapper(tuple(self.select_fields(params.fields)))
+        return dumps({"message": "success", "data": [mapper(row) for row in rows], "next_cursor": next_cursor})
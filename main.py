@@ -1,16 +1,129 @@
+import asyncio
 import uvicorn
-from fastapi import FastAPI
-from modifiername_mstr import router as modifiers
-from nounvalue_mstr import router as nounvalue
-from attributenameproject import router as attributename
-from attributevalueprojec import router as  attributevalue
-
-app = FastAPI()
-app.include_router(modifiers, prefix="/modifiers", tags=["modifiers"])
-app.include_router(nounvalue, prefix="/nounvalue", tags=["nounvalue"])
-app.include_router(attributename, prefix="/attributename", tags=["attributename"])
-app.include_router(attributevalue, prefix="/attributevalue", tags=["attributevalue"])
-
-if __name__ == "_main_":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import init_engine, dispose_engine
+from cache import cache_stats
+from compression import CompressionMiddleware
+from replicas import ReadYourWritesMiddleware, dispose_replicas, get_read_db, init_replicas, monitor_replicas
+from metrics import MetricsMiddleware, TimedRoute, render_metrics
+from search import (
+    SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SearchResponse, ensure_search_indexes, search_tables, searchable_tables
+)
+from master_router import create_master_router
+from hierarchy import router as hierarchy
+from changes import maintain_changelog, router as changes
+from push import hub, router as push
+from validation import router as validation
+from snapshot import SNAPSHOT_ENABLED, snapshots
+from jobs import router as jobs, start_jobs, stop_jobs
+from lifecycle import lifecycle
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared engine/pool on startup and release its connections on shutdown
+    init_engine()
+    init_replicas()
+    replica_health = asyncio.create_task(monitor_replicas())
+    # Index builds can take a while on large tables, so they do not hold up startup
+    index_build = asyncio.create_task(ensure_search_indexes())
+    # Installs the change feed triggers and prunes old changes
+    changelog = asyncio.create_task(maintain_changelog())
+    # Background import/export/reindex jobs, with their own small pool
+    start_jobs()
+    if SNAPSHOT_ENABLED:
+        # Snapshots are rebuilt when any worker's write is notified
+        hub.listeners.append(snapshots.refresh)
+        hub.start()
+        await snapshots.load_all()
+    # Change streams end when draining starts; their clients reconnect to another worker
+    lifecycle.on_drain.append(hub.disconnect_all)
+    lifecycle.watch_signals()
+    # Opens the pools' connections and fills the caches; the server accepts requests once this returns
+    await lifecycle.warm_up()
+    yield
+    await lifecycle.stop()
+    await stop_jobs()
+    await snapshots.close()
+    await hub.stop()
+    index_build.cancel()
+    changelog.cancel()
+    replica_health.cancel()
+    await dispose_replicas()
+    await dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TimedRoute
+# Innermost, so request metrics include compression time
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+# One router per master table: table, ID column, ID prefix, name column and path
+app.include_router(create_master_router("modifier_name_mstr", "modifier_id", "M", "modifier", "/modifiers"),
+                   prefix="/modifiers", tags=["modifiers"])
+app.include_router(create_master_router("noun_value_mstr", "noun_id", "N", "noun", "/nounvalue"),
+                   prefix="/nounvalue", tags=["nounvalue"])
+app.include_router(create_master_router("attri_name_mstr", "modifier_id", "M", "modifier", "/attributename"),
+                   prefix="/attributename", tags=["attributename"])
+app.include_router(create_master_router("attri_value_mstr", "noun_id", "N", "noun", "/attributevalue"),
+                   prefix="/attributevalue", tags=["attributevalue"])
+app.include_router(hierarchy, tags=["hierarchy"])
+app.include_router(jobs, tags=["jobs"])
+app.include_router(changes, tags=["changes"])
+app.include_router(push, tags=["changes"])
+app.include_router(validation, tags=["validation"])
+
+
+@app.get("/cache/stats", tags=["cache"])
+async def get_cache_stats():
+    return cache_stats()
+
+
+# For load balancers: 200 once this worker has warmed up, 503 while it starts or drains for shutdown
+@app.get("/ready", tags=["health"])
+async def get_ready():
+    if not lifecycle.ready:
+        raise HTTPException(status_code=503, detail="draining" if lifecycle.draining else "starting")
+    return {"status": "ready"}
 
+
+# Rows, version and approximate memory of each in-memory snapshot (SNAPSHOT_ENABLED)
+@app.get("/snapshot/stats", tags=["cache"])
+async def get_snapshot_stats():
+    return snapshots.stats()
+
+
+# Prometheus text format: request latency, DB vs serialization time, rows, pool and cache usage
+@app.get("/metrics", response_class=PlainTextResponse, tags=["metrics"])
+async def get_metrics():
+    return PlainTextResponse(render_metrics(cache_stats()), media_type="text/plain; version=0.0.4")
+
+
+# Typeahead across all master tables, or the ones listed in `tables`
+@app.get("/search", response_model=SearchResponse, tags=["search"])
+async def search_all(
+    q: str = Query(..., min_length=1),
+    tables: Optional[List[str]] = Query(None),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    isActive: Optional[bool] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    known = searchable_tables()
+    unknown = [table for table in tables or [] if table not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown)}")
+    try:
+        return await search_tables(db, tables or known, q, limit, isActive)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Development server with reload; use server.py in production
+if __name__ == "__main__":
+    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,86 @@
+import re
+from typing import NamedTuple
+
+from sqlalchemy import ARRAY, Boolean, String, bindparam, text
+from sqlalchemy.sql.expression import Executable
+
+# SQL queries shared by every master table, formatted with the table's
+# {table}, {id_field} and {name_field} when its router is created
+
+GET_BY_ID = """
+    SELECT {id_field} AS "{id_field}", {name_field} AS "{name_field}", abbreviation, description, isActive AS "isActive"
+    FROM {table}
+    WHERE {id_field} = :id;
+"""
+
+# Batch lookup: one round trip for any number of IDs
+LOOKUP = """
+    SELECT {id_field} AS "{id_field}", {name_field} AS "{name_field}", abbreviation, description, isActive AS "isActive"
+    FROM {table}
+    WHERE {id_field} = ANY(CAST(:ids AS TEXT[]));
+"""
+
+CREATE = """
+    INSERT INTO {table} ({id_field}, {name_field}, abbreviation, description, isActive)
+    VALUES (:id, :name, :abbreviation, :description, :isActive)
+    RETURNING {id_field} AS "{id_field}", {name_field} AS "{name_field}", abbreviation, description, isActive AS "isActive";
+"""
+
+# Fields passed as NULL keep their current value
+UPDATE = """
+    UPDATE {table}
+    SET {name_field} = COALESCE(:name, {name_field}),
+        abbreviation = COALESCE(:abbreviation, abbreviation),
+        description = COALESCE(:description, description),
+        isActive = COALESCE(:isActive, isActive)
+    WHERE {id_field} = :id
+    RETURNING {id_field} AS "{id_field}", {name_field} AS "{name_field}", abbreviation, description, isActive AS "isActive";
+"""
+
+DELETE = """
+    DELETE FROM {table}
+    WHERE {id_field} = :id
+    RETURNING {id_field};
+"""
+
+
+class MasterStatements(NamedTuple):
+    get_by_id: Executable
+    lookup: Executable
+    create: Executable
+    update: Executable
+    delete: Executable
+
+
+# Declared bind types: SQLAlchemy does not have to guess them per call, and the
+# asyncpg driver sends explicit casts, so Postgres can reuse the prepared plan
+_BINDS = {
+    "id": bindparam("id", type_=String()),
+    "ids": bindparam("ids", type_=ARRAY(String())),
+    "name": bindparam("name", type_=String()),
+    "abbreviation": bindparam("abbreviation", type_=String()),
+    "description": bindparam("description", type_=String()),
+    "isActive": bindparam("isActive", type_=Boolean()),
+}
+
+
+def _statement(template: str, table: str, id_field: str, name_field: str, returns_row: bool = True):
+    sql = template.format(table=table, id_field=id_field, name_field=name_field)
+    statement = text(sql).bindparams(*(bind for name, bind in _BINDS.items() if re.search(rf":{name}\b", sql)))
+    if returns_row:
+        statement = statement.columns(**{
+            id_field: String(), name_field: String(), "abbreviation": String(), "description": String(),
+            "isActive": Boolean(),
+        })
+    return statement
+
+
+def compile_statements(table: str, id_field: str, name_field: str) -> MasterStatements:
+    """Builds the typed statements of one master table; done once, when its router is created."""
+    return MasterStatements(
+        get_by_id=_statement(GET_BY_ID, table, id_field, name_field),
+        lookup=_statement(LOOKUP, table, id_field, name_field),
+        create=_statement(CREATE, table, id_field, name_field),
+        update=_statement(UPDATE, table, id_field, name_field),
+        delete=_statement(DELETE, table, id_field, name_field, returns_row=False),
+    )
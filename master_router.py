@@ -0,0 +1,282 @@
+import os
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, create_model
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bulk import (
+    BULK_CHUNK_SIZE, BulkActiveSelection, BulkChangeResponse, BulkResponse, BulkSelection, BulkWriter,
+    read_bulk_rows
+)
+from cache import get_cache
+from changes import register_change_table
+from compression import COMPRESSION_ENABLED, Payload, payload_response
+from database import get_db
+from export import export_response
+from id_allocator import SequenceIdAllocator, register_allocator
+from jobs import register_job_table
+from lifecycle import lifecycle
+from listing import LIST_DEFAULT_LIMIT, KeysetLister, ListParams, PageResponse
+from master_query import compile_statements
+from metrics import TimedRoute
+from replicas import get_read_db, read_engine, read_only, reads_from_primary
+from search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SearchResponse, TableSearch, register_search, search_tables
+from serialization import FAST_JSON, as_response, dumps
+from snapshot import snapshots
+from versioning import bump_version, forget_version, get_version, not_modified_response
+
+# Largest ID list accepted by the lookup endpoints
+LOOKUP_MAX_IDS = int(os.getenv("LOOKUP_MAX_IDS", "10000"))
+
+
+class LookupRequest(BaseModel):
+    ids: List[str]
+
+
+def _model_stem(table: str) -> str:
+    # noun_value_mstr -> NounValue
+    return "".join(part.title() for part in table.removesuffix("_mstr").split("_"))
+
+
+def create_master_router(table: str, id_field: str, id_prefix: str, name_field: str, path: str) -> APIRouter:
+    """Builds the CRUD, list, export, search and bulk routes of one master table.
+
+    Every master table has the same shape: an ID column, a name column, an
+    abbreviation, a description and an isActive flag. The routes are served
+    under ``path`` (e.g. ``/nounvalue``) and the request and response models
+    use the table's own column names.
+    """
+    stem = _model_stem(table)
+    label = name_field.title()
+
+    Create = create_model(
+        f"{stem}Create",
+        **{name_field: (str, ...)}, abbreviation=(str, ...), description=(str, ...), isActive=(bool, ...)
+    )
+    Update = create_model(
+        f"{stem}Update",
+        **{name_field: (Optional[str], None)},
+        abbreviation=(Optional[str], None), description=(Optional[str], None), isActive=(Optional[bool], None)
+    )
+    ResponseData = create_model(
+        f"{stem}ResponseData",
+        **{id_field: (str, ...), name_field: (str, ...)},
+        abbreviation=(str, ...), description=(str, ...), isActive=(bool, ...)
+    )
+    ItemResponse = create_model(f"{stem}Response", message=(str, ...), data=(List[ResponseData], ...))
+    # Found rows keyed by ID, and the requested IDs that do not exist
+    LookupResponse = create_model(
+        f"{stem}LookupResponse",
+        message=(str, ...), data=(Dict[str, ResponseData], ...), missing=(List[str], ...)
+    )
+
+    statements = compile_statements(table, id_field, name_field)
+
+    allocator = register_allocator(table, SequenceIdAllocator(id_prefix, table, id_field))
+    lister = KeysetLister(table, id_field, name_field)
+    cache = get_cache(table)
+    register_search(TableSearch(table, id_field, name_field))
+    bulk = BulkWriter(table, id_field, name_field, Create)
+    register_job_table(table, bulk, lister)
+    register_change_table(lister)
+    snapshots.register(lister)
+
+    def item_response(row) -> BaseModel:
+        return ItemResponse(message="success", data=[ResponseData(**lister.to_item(row))])
+
+    async def committed(db: AsyncSession):
+        await bump_version(db, table)
+        await db.commit()
+        cache.clear()
+        forget_version(table)
+
+    async def load_page(db: AsyncSession, version: int, params: ListParams) -> Any:
+        cache_key = ("list", version) + params.cache_key()
+        page = cache.get(cache_key)
+        if page is None:
+            generation = cache.generation
+            snapshot = snapshots.current(table, version)
+            body = snapshot.page(params) if snapshot is not None else None
+            if body is not None:
+                page = dumps(body) if FAST_JSON else PageResponse(**body)
+            elif FAST_JSON:
+                page = await lister.fetch_page_json(db, params)
+            else:
+                page = await lister.fetch_page(db, params)
+            if COMPRESSION_ENABLED:
+                # Cached encoded, so repeat requests skip serialization and compression
+                page = Payload(page if isinstance(page, bytes) else dumps(page.model_dump()))
+            cache.set(cache_key, page, generation)
+        return page
+
+    async def warm_cache(db: AsyncSession):
+        # The table version and the first page with default parameters, which most clients start with
+        params = ListParams(after=None, limit=LIST_DEFAULT_LIMIT, isActive=None, name=None, abbreviation=None,
+                            fields=None)
+        await load_page(db, await get_version(db, table), params)
+
+    lifecycle.register_warmup(warm_cache)
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get(path, response_model=PageResponse)
+    async def list_items(
+        request: Request,
+        response: Response,
+        params: ListParams = Depends(),
+        db: AsyncSession = Depends(get_read_db)
+    ):
+        try:
+            version = await get_version(db, table, fresh=reads_from_primary(request))
+            not_modified = not_modified_response(request, response, table, version)
+            if not_modified is not None:
+                return not_modified
+            page = await load_page(db, version, params)
+            if isinstance(page, Payload):
+                return payload_response(page, request, response)
+            return as_response(page, response)
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    @router.get(f"{path}/export")
+    async def export_items(request: Request, format: Literal["ndjson", "csv"] = "ndjson",
+                           isActive: Optional[bool] = None):
+        return export_response(lister, format, isActive, read_engine(request))
+
+    @router.get(f"{path}/search", response_model=SearchResponse)
+    async def search_items(
+        q: str = Query(..., min_length=1),
+        limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+        isActive: Optional[bool] = None,
+        db: AsyncSession = Depends(get_read_db)
+    ):
+        try:
+            return await search_tables(db, [table], q, limit, isActive)
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    # Resolves many IDs with one query; a read, even though it is a POST
+    @router.post(f"{path}/lookup", response_model=LookupResponse, dependencies=[Depends(read_only)])
+    async def lookup_items(lookup: LookupRequest, request: Request, db: AsyncSession = Depends(get_read_db)):
+        ids = list(dict.fromkeys(lookup.ids))
+        if len(ids) > LOOKUP_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {LOOKUP_MAX_IDS} IDs per lookup.")
+        try:
+            snapshot = snapshots.current(table, await get_version(db, table, fresh=reads_from_primary(request)))
+            if snapshot is not None:
+                found = {item_id: item for item_id, item in ((i, snapshot.item(i)) for i in ids) if item is not None}
+            else:
+                result = await db.execute(statements.lookup, {"ids": ids})
+                found = {row[0]: lister.to_item(row) for row in result}
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        body = {"message": "success", "data": found, "missing": [i for i in ids if i not in found]}
+        # The rows are already plain dicts; thousands of them need not go through the models
+        return as_response(dumps(body)) if FAST_JSON else body
+
+    @router.get(f"{path}/{{item_id}}", response_model=ItemResponse)
+    async def get_item(item_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+        try:
+            version = await get_version(db, table, fresh=reads_from_primary(request))
+            not_modified = not_modified_response(request, response, table, version)
+            if not_modified is not None:
+                return not_modified
+            cached = cache.get(("id", version, item_id))
+            if cached is not None:
+                return cached
+            generation = cache.generation
+            snapshot = snapshots.current(table, version)
+            if snapshot is not None:
+                item = snapshot.item(item_id)
+                if item is None:
+                    raise HTTPException(status_code=404, detail=f"{label} not found.")
+                body = ItemResponse(message="success", data=[ResponseData(**item)])
+            else:
+                result = await db.execute(statements.get_by_id, {"id": item_id})
+                row = result.fetchone()
+                if row is None:
+                    raise HTTPException(status_code=404, detail=f"{label} not found.")
+                body = item_response(row)
+            cache.set(("id", version, item_id), body, generation)
+            return body
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    @router.post(path, response_model=ItemResponse)
+    async def create_item(entry: Create, db: AsyncSession = Depends(get_db)):
+        try:
+            item_id = await allocator.next_id(db)
+            result = await db.execute(statements.create, {
+                "id": item_id,
+                "name": getattr(entry, name_field),
+                "abbreviation": entry.abbreviation,
+                "description": entry.description,
+                "isActive": entry.isActive
+            })
+            row = result.fetchone()
+            await committed(db)
+            return item_response(row)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Duplicate entry.")
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    @router.post(f"{path}/bulk", response_model=BulkResponse)
+    async def bulk_upsert_items(
+        request: Request,
+        chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=10000),
+        db: AsyncSession = Depends(get_db)
+    ):
+        rows = await read_bulk_rows(request, id_field)
+        return await bulk.upsert(db, rows, chunk_size)
+
+    @router.post(f"{path}/bulk/delete", response_model=BulkChangeResponse)
+    async def bulk_delete_items(selection: BulkSelection, db: AsyncSession = Depends(get_db)):
+        return await bulk.delete(db, selection)
+
+    @router.post(f"{path}/bulk/active", response_model=BulkChangeResponse)
+    async def bulk_set_active_items(selection: BulkActiveSelection, db: AsyncSession = Depends(get_db)):
+        return await bulk.set_active(db, selection)
+
+    @router.put(f"{path}/{{item_id}}", response_model=ItemResponse)
+    @router.patch(f"{path}/{{item_id}}", response_model=ItemResponse)
+    async def update_item(item_id: str, entry: Update, db: AsyncSession = Depends(get_db)):
+        try:
+            result = await db.execute(statements.update, {
+                "id": item_id,
+                "name": getattr(entry, name_field),
+                "abbreviation": entry.abbreviation,
+                "description": entry.description,
+                "isActive": entry.isActive
+            })
+            row = result.fetchone()
+            if row is None:
+                await db.rollback()
+                raise HTTPException(status_code=404, detail=f"{label} not found.")
+            await committed(db)
+            return item_response(row)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Update failed due to invalid data.")
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    @router.delete(f"{path}/{{item_id}}")
+    async def delete_item(item_id: str, db: AsyncSession = Depends(get_db)):
+        try:
+            result = await db.execute(statements.delete, {"id": item_id})
+            if result.fetchone() is None:
+                await db.rollback()
+                raise HTTPException(status_code=404, detail=f"{label} not found.")
+            await committed(db)
+            return {"message": f"{label} with ID {item_id} deleted successfully."}
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    return router
@@ -0,0 +1,321 @@
+import inspect
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from settings import env_bool
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = env_bool("METRICS_ENABLED", "true")
+# Statements slower than this are logged (instead of echoing every statement)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Fraction of slow statements that are logged, to keep a struggling database from flooding the log
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+class Histogram:
+    """A labelled histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket counts, then sum and count
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self._series.items():
+            base = _format_labels(self.labels, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_join(base, 'le', bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_join(base, 'le', '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{{{base}}} {total}" if base else f"{self.name}_sum {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}" if base else f"{self.name}_count {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], value: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._series.items():
+            base = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}{{{base}}} {value}" if base else f"{self.name} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _join(base: str, name: str, value: Any) -> str:
+    extra = f'{name}="{value}"'
+    return "{" + (f"{base},{extra}" if base else extra) + "}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the response headers",
+    ("method", "route", "status"))
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time a request spent executing SQL statements", ("method", "route"))
+REQUEST_SERIALIZATION_TIME = Histogram(
+    "http_request_serialization_seconds",
+    "Time a request spent in the route outside the endpoint function: request parsing, response validation and encoding",
+    ("method", "route"))
+REQUEST_ROWS = Histogram(
+    "http_request_db_rows", "Rows returned or changed by the SQL statements of a request", ("method", "route"),
+    buckets=ROW_BUCKETS)
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Execution time of single SQL statements", ("engine", "statement"))
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("engine", "statement"))
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for (or opening) a pooled connection", ("engine",))
+
+_HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_SERIALIZATION_TIME, REQUEST_ROWS, QUERY_DURATION,
+               POOL_CHECKOUT_WAIT)
+
+
+class RequestTimings:
+    """Per-request accumulator, shared with the SQLAlchemy hooks through a context variable."""
+    __slots__ = ("db_seconds", "rows", "route_seconds", "endpoint_seconds")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.route_seconds = 0.0
+        self.endpoint_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records latency, DB time and row counts per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                _record(scope, message["status"], time.perf_counter() - start, timings)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not started:
+                _record(scope, 500, time.perf_counter() - start, timings)
+            raise
+        finally:
+            _current.reset(token)
+
+
+def _route_label(scope) -> str:
+    # Unmatched paths share one label so scanners cannot blow up the series count
+    if scope.get("route") is None:
+        return "unmatched"
+    route = scope["route"]
+    template = getattr(route, "path_format", None)
+    if template is None:
+        return "unmatched"
+    # The route does not carry the prefix of the router it was included with
+    # (or of a mount); that prefix is the part of the path before the route's
+    # own pattern matches
+    path = scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + template
+    return template
+
+
+def _record(scope, status: int, elapsed: float, timings: RequestTimings):
+    path = _route_label(scope)
+    method = scope["method"]
+    REQUEST_DURATION.observe((method, path, str(status)), elapsed)
+    REQUEST_DB_TIME.observe((method, path), timings.db_seconds)
+    REQUEST_ROWS.observe((method, path), timings.rows)
+    if timings.route_seconds:
+        REQUEST_SERIALIZATION_TIME.observe((method, path), max(timings.route_seconds - timings.endpoint_seconds, 0.0))
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that separates the endpoint's own time from FastAPI's parsing and serialization."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if METRICS_ENABLED:
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not METRICS_ENABLED:
+            return handler
+
+        async def timed_handler(request):
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    timings.route_seconds += time.perf_counter() - start
+        return timed_handler
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    if not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings = _current.get()
+            if timings is not None:
+                timings.endpoint_seconds += time.perf_counter() - start
+    return timed
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that records how long each checkout waited for a connection."""
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe((self.metrics_name,), time.perf_counter() - start)
+
+
+_engines: Dict[str, AsyncEngine] = {}
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].upper() if words else ""
+    return kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str = "primary") -> AsyncEngine:
+    """Attaches the statement timing and slow query hooks to an engine."""
+    _engines[name] = engine
+    if not METRICS_ENABLED:
+        return engine
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, TimedQueuePool):
+        sync_engine.pool.metrics_name = name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        kind = _statement_kind(statement)
+        QUERY_DURATION.observe((name, kind), elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.db_seconds += elapsed
+            if cursor.rowcount and cursor.rowcount > 0:
+                timings.rows += cursor.rowcount
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES.inc((name, kind))
+            if random.random() < SLOW_QUERY_SAMPLE_RATE:
+                logger.warning("Slow query on %s (%.1f ms): %s", name, elapsed * 1000, " ".join(statement.split())[:1000])
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # Keep the timing stack balanced when a statement fails
+        starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    return engine
+
+
+def _pool_lines() -> List[str]:
+    lines = [
+        "# HELP db_pool_connections Pooled connections by state",
+        "# TYPE db_pool_connections gauge",
+    ]
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            continue
+        lines.append(f'db_pool_connections{{engine="{name}",state="in_use"}} {pool.checkedout()}')
+        lines.append(f'db_pool_connections{{engine="{name}",state="idle"}} {pool.checkedin()}')
+        lines.append(f'db_pool_connections{{engine="{name}",state="overflow"}} {max(pool.overflow(), 0)}')
+        lines.append(f'db_pool_connections{{engine="{name}",state="size"}} {pool.size()}')
+    return lines
+
+
+def render_metrics(cache_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    lines: List[str] = []
+    for histogram in _HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(SLOW_QUERIES.render())
+    lines.extend(_pool_lines())
+    if cache_stats:
+        for stat, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("size", "gauge")):
+            metric = f"cache_{stat}_total" if kind == "counter" else f"cache_{stat}"
+            lines.append(f"# TYPE {metric} {kind}")
+            for table, stats in cache_stats.items():
+                lines.append(f'{metric}{{table="{table}"}} {stats[stat]}')
+    return "\n".join(lines) + "\n"
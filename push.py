@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, Callable, List, Optional, Set
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import database
+from changes import (
+    CHANGES_CHANNEL, CHANGES_MAX_LIMIT, Change, check_tables, check_token, current_token, ensure_changelog,
+    fetch_changes, parse_token
+)
+from metrics import TimedRoute
+
+logger = logging.getLogger(__name__)
+
+# Fallback poll of the change feed, for changes whose notification arrived
+# before every older transaction had finished
+PUSH_POLL_INTERVAL = float(os.getenv("PUSH_POLL_INTERVAL", "1"))
+# Comment lines sent on idle streams so proxies keep them open
+PUSH_HEARTBEAT_SECONDS = float(os.getenv("PUSH_HEARTBEAT_SECONDS", "15"))
+# Events buffered per client; a client that falls further behind is disconnected and catches up on reconnect
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "1000"))
+
+
+class Subscriber:
+    def __init__(self, tables: Optional[List[str]]):
+        self.tables: Optional[Set[str]] = set(tables) if tables else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PUSH_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, change: Change):
+        if self.overflowed or (self.tables is not None and change.table not in self.tables):
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    def close(self):
+        # Wakes the stream so it ends; the client resumes from its last event
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ChangeHub:
+    """Fans the change feed out to the push streams of this process.
+
+    One connection of its own LISTENs for the notifications sent by the
+    changelog triggers, from any worker process, and reads the new changes
+    from the feed once per wake-up, however many clients are subscribed.
+    """
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        # Called with the table name of every notification, e.g. to refresh snapshots
+        self.listeners: List[Callable[[str], None]] = []
+        self._engine: Optional[AsyncEngine] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        # Position in the change feed, kept across reconnects
+        self._since: Optional[str] = None
+
+    def start(self):
+        if self._task is None:
+            self._engine = database.build_engine(database.DATABASE_URL, "push", pool_size=1, max_overflow=0)
+            self._task = asyncio.create_task(self._run())
+
+    def subscribe(self, tables: Optional[List[str]]) -> Subscriber:
+        self.start()
+        subscriber = Subscriber(tables)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def disconnect_all(self):
+        # On shutdown, so open streams do not hold up draining; clients reconnect to another worker
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+
+    def _notified(self, connection, pid, channel, payload):
+        self._wake.set()
+        for listener in self.listeners:
+            listener(payload)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except (SQLAlchemyError, OSError) as e:
+                logger.warning("Change push lost its database connection: %s", e)
+                await asyncio.sleep(PUSH_POLL_INTERVAL)
+
+    async def _listen(self):
+        await ensure_changelog()
+        async with self._engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.add_listener(CHANGES_CHANNEL, self._notified)
+            if self._since is None:
+                self._since = await current_token(conn)
+            while True:
+                # Ends the transaction so the connection holds no snapshot while it waits
+                await conn.rollback()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), PUSH_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                if not self.subscribers:
+                    self._since = await current_token(conn)
+                    continue
+                while True:
+                    page = await fetch_changes(conn, self._since, None, CHANGES_MAX_LIMIT)
+                    for change in page.changes:
+                        for subscriber in list(self.subscribers):
+                            subscriber.offer(change)
+                    self._since = page.next_since
+                    if not page.has_more:
+                        break
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._engine is not None:
+            await self._engine.dispose()
+        self._task, self._engine, self._since = None, None, None
+        self.subscribers.clear()
+
+
+hub = ChangeHub()
+router = APIRouter(route_class=TimedRoute)
+
+
+def _event(change: Change) -> str:
+    return f"id: {change.token}\nevent: {change.operation}\ndata: {change.model_dump_json()}\n\n"
+
+
+async def _backlog(since: str, tables: Optional[List[str]]) -> AsyncIterator[Change]:
+    async with database.init_engine().connect() as conn:
+        while True:
+            page = await fetch_changes(conn, since, tables, CHANGES_MAX_LIMIT)
+            for change in page.changes:
+                yield change
+            since = page.next_since
+            if not page.has_more:
+                return
+
+
+async def _stream(subscriber: Subscriber, since: Optional[str], tables: Optional[List[str]]) -> AsyncIterator[str]:
+    try:
+        # Changes missed while disconnected, then live ones; the subscription
+        # is already open, so live events the backlog covered are skipped
+        last = None
+        if since is not None:
+            async for change in _backlog(since, tables):
+                last = parse_token(change.token)
+                yield _event(change)
+        yield ": connected\n\n"
+        while True:
+            try:
+                change = await asyncio.wait_for(subscriber.queue.get(), PUSH_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if change is None:
+                return
+            if last is not None and parse_token(change.token) <= last:
+                continue
+            yield _event(change)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+# Server-sent events: one event per created, updated or deleted row, named
+# after the operation and carrying the same JSON as a GET /changes entry.
+# Browsers' EventSource reconnects by itself and resumes from Last-Event-ID.
+@router.get("/changes/stream")
+async def stream_changes(
+    tables: Optional[List[str]] = Query(None),
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    check_tables(tables)
+    since = last_event_id or since
+    try:
+        await ensure_changelog()
+        if since is not None:
+            async with database.init_engine().connect() as conn:
+                await check_token(conn, since)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    subscriber = hub.subscribe(tables)
+    return StreamingResponse(
+        _stream(subscriber, since, tables),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Comma separated async SQLAlchemy URLs of read replicas; GET requests are spread over them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Pool of each replica engine, per worker process
+REPLICA_POOL_SIZE = int(os.getenv("REPLICA_POOL_SIZE", str(database.DB_POOL_SIZE)))
+REPLICA_MAX_OVERFLOW = int(os.getenv("REPLICA_MAX_OVERFLOW", str(database.DB_MAX_OVERFLOW)))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+# Replicas further behind the primary than this are skipped (0 disables the check)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "0"))
+# After a write, the same client reads from the primary for this long (0 disables read-your-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+READ_PRIMARY_HEADER = "x-read-primary-until"
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# NULL on a primary (or a stand-in that is not replicating): no lag
+REPLICA_LAG = """
+    SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    WHERE pg_is_in_recovery()
+    UNION ALL
+    SELECT 0 WHERE NOT pg_is_in_recovery();
+"""
+
+
+class Replica:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine: AsyncEngine = database.build_engine(url, name, REPLICA_POOL_SIZE, REPLICA_MAX_OVERFLOW)
+        self.SessionLocal: sessionmaker = database.make_sessionmaker(self.engine)
+        # Replicas start out healthy so reads do not wait for the first check
+        self.healthy = True
+        self.lag = 0.0
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                self.lag = float((await conn.execute(text(REPLICA_LAG))).scalar() or 0)
+            healthy = not REPLICA_MAX_LAG_SECONDS or self.lag <= REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            logger.warning("Replica %s failed its health check: %s", self.name, e)
+            healthy = False
+        if healthy != self.healthy:
+            logger.warning("Replica %s is now %s", self.name, "healthy" if healthy else "unhealthy")
+        self.healthy = healthy
+
+
+replicas: List[Replica] = []
+_next = itertools.count()
+
+
+def init_replicas() -> List[Replica]:
+    if not replicas:
+        replicas.extend(Replica(f"replica{i}", url) for i, url in enumerate(DATABASE_REPLICA_URLS))
+    return replicas
+
+
+async def dispose_replicas():
+    for replica in replicas:
+        await replica.engine.dispose()
+    replicas.clear()
+
+
+async def monitor_replicas():
+    """Health checks every replica in the background; unhealthy ones get no reads until they recover."""
+    while replicas:
+        await asyncio.gather(*(replica.check() for replica in replicas))
+        await asyncio.sleep(REPLICA_HEALTH_INTERVAL)
+
+
+def reads_from_primary(request: Optional[Request]) -> bool:
+    """Whether the client wrote recently; its reads then go to the primary and skip memoized versions."""
+    if request is None or not READ_YOUR_WRITES_SECONDS:
+        return False
+    until = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def _pick_replica(request: Optional[Request]) -> Optional[Replica]:
+    if not replicas or reads_from_primary(request):
+        return None
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return None
+    return healthy[next(_next) % len(healthy)]
+
+
+def read_engine(request: Optional[Request] = None) -> AsyncEngine:
+    replica = _pick_replica(request)
+    return replica.engine if replica is not None else database.init_engine()
+
+
+# Database dependency for GET handlers: a replica session, or the primary when
+# there are no healthy replicas or the client has just written
+async def get_read_db(request: Request):
+    replica = _pick_replica(request)
+    if replica is None:
+        async for session in database.get_db():
+            yield session
+        return
+    async with replica.SessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def read_only(request: Request):
+    """Dependency for POST handlers that only read (e.g. batch lookups), so the
+    client is not sent to the primary afterwards."""
+    request.state.read_only = True
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients that made a successful write so their next reads go to the primary.
+
+    The deadline is sent back both as a cookie and as a header, for clients
+    that do not keep cookies and echo the header instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not replicas or not READ_YOUR_WRITES_SECONDS
+                or scope["method"] in ("GET", "HEAD", "OPTIONS")):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if (message["type"] == "http.response.start" and 200 <= message["status"] < 300
+                    and not scope.get("state", {}).get("read_only")):
+                until = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+                cookie = (f"{READ_PRIMARY_COOKIE}={until}; Max-Age={int(READ_YOUR_WRITES_SECONDS) or 1}; "
+                          f"Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (READ_PRIMARY_HEADER.encode(), until.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
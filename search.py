@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+from listing import like_prefix
+from settings import env_bool
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "10"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+# Build the trigram indexes on startup; turn off where indexes are managed by the DBA
+SEARCH_CREATE_INDEXES = env_bool("SEARCH_CREATE_INDEXES", "true")
+# Wait before building the indexes again after a failure
+SEARCH_INDEX_RETRY_SECONDS = float(os.getenv("SEARCH_INDEX_RETRY_SECONDS", "30"))
+
+ENSURE_TRIGRAM_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+
+CHECK_TRIGRAM_EXTENSION = "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm';"
+
+# GIN trigram indexes serve both the ILIKE prefix match and the % similarity match
+CREATE_TRIGRAM_INDEX = "CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_{column}_trgm_idx ON {table} USING gin ({column} gin_trgm_ops);"
+
+
+class SearchResult(BaseModel):
+    table: str
+    id: str
+    name: str
+    abbreviation: str
+    isActive: bool
+    score: float
+
+
+class SearchResponse(BaseModel):
+    message: str
+    data: List[SearchResult]
+
+
+class TableSearch:
+    """Ranked typeahead over the name and abbreviation of one master table.
+
+    Prefix matches rank first, then trigram similarity (pg_trgm). Without the
+    extension the search falls back to case-insensitive prefix matching.
+    """
+
+    def __init__(self, table: str, id_field: str, name_field: str):
+        self.table = table
+        self.id_field = id_field
+        self.name_field = name_field
+
+    def select(self, trigram: bool, active_filter: bool) -> str:
+        name, table = self.name_field, self.table
+        prefix_match = f"({name} ILIKE :prefix OR abbreviation ILIKE :prefix)"
+        if trigram:
+            score = f"GREATEST(similarity({name}, :q), similarity(abbreviation, :q))"
+            match = f"({prefix_match} OR {name} % :q OR abbreviation % :q)"
+        else:
+            score = "0.0"
+            match = prefix_match
+        where = match + (" AND isActive = :is_active" if active_filter else "")
+        return f"""
+            (SELECT '{table}' AS "table", {self.id_field} AS id, {name} AS name,
+                    abbreviation, isActive AS "isActive",
+                    {prefix_match} AS prefix_match, {score} AS score
+             FROM {table}
+             WHERE {where}
+             ORDER BY prefix_match DESC, score DESC, {self.id_field}
+             LIMIT :limit)
+        """
+
+
+_searches: Dict[str, TableSearch] = {}
+_trigram: Optional[bool] = None
+_trigram_lock = asyncio.Lock()
+
+
+def register_search(search: TableSearch) -> TableSearch:
+    _searches[search.table] = search
+    return search
+
+
+async def _trigram_available() -> bool:
+    global _trigram
+    async with _trigram_lock:
+        if _trigram is None:
+            try:
+                async with database.init_engine().begin() as conn:
+                    await conn.execute(text(ENSURE_TRIGRAM_EXTENSION))
+            except SQLAlchemyError as e:
+                logger.warning("pg_trgm could not be enabled, search uses prefix matching only: %s", e)
+            async with database.init_engine().connect() as conn:
+                _trigram = (await conn.execute(text(CHECK_TRIGRAM_EXTENSION))).scalar() is not None
+    return _trigram
+
+
+async def _trigram_for_search() -> bool:
+    # Not known yet and the primary is unreachable: prefix search still works, on a replica too
+    try:
+        return await _trigram_available()
+    except (SQLAlchemyError, OSError) as e:
+        logger.warning("Could not check for pg_trgm, searching by prefix: %s", e)
+        return False
+
+
+async def ensure_search_indexes():
+    """Builds the trigram indexes without blocking writes; meant to run in the background."""
+    if not SEARCH_CREATE_INDEXES:
+        return
+    while True:
+        try:
+            if not await _trigram_available():
+                return
+            async with database.init_engine().connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                # Only one worker builds the indexes
+                await conn.execute(text("SELECT pg_advisory_lock(hashtext('master_search_indexes'));"))
+                try:
+                    for search in _searches.values():
+                        for column in (search.name_field, "abbreviation"):
+                            await conn.execute(text(CREATE_TRIGRAM_INDEX.format(table=search.table, column=column)))
+                finally:
+                    await conn.execute(text("SELECT pg_advisory_unlock(hashtext('master_search_indexes'));"))
+            return
+        except SQLAlchemyError as e:
+            logger.warning("Could not build search indexes: %s", e)
+            return
+        except OSError as e:
+            # The database is not reachable (yet); try again later
+            logger.warning("Could not build search indexes: %s", e)
+        await asyncio.sleep(SEARCH_INDEX_RETRY_SECONDS)
+
+
+async def search_tables(db: AsyncSession, tables: List[str], q: str, limit: int,
+                        is_active: Optional[bool] = None) -> SearchResponse:
+    trigram = await _trigram_for_search()
+    parts = [_searches[table].select(trigram, is_active is not None) for table in tables]
+    query = " UNION ALL ".join(parts)
+    if len(parts) > 1:
+        query = f"SELECT * FROM ({query}) AS matches ORDER BY prefix_match DESC, score DESC, id LIMIT :limit"
+    bind: Dict[str, Any] = {"q": q, "prefix": like_prefix(q), "limit": limit}
+    if is_active is not None:
+        bind["is_active"] = is_active
+    result = await db.execute(text(query), bind)
+    return SearchResponse(message="success", data=[
+        SearchResult(
+            table=row.table,
+            id=row.id,
+            name=row.name or "",
+            abbreviation=row.abbreviation or "",
+            isActive=row.isActive if isinstance(row.isActive, bool) else True,
+            score=1.0 if row.prefix_match else float(row.score),
+        ) for row in result
+    ])
+
+
+def searchable_tables() -> List[str]:
+    return list(_searches)
@@ -0,0 +1,42 @@
+import json
+from typing import Any, Optional, Union
+
+from fastapi import Response
+
+from settings import env_bool
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder produces the same bytes
+    orjson = None
+
+# Encode list pages straight from the database rows instead of going through Pydantic
+FAST_JSON = env_bool("FAST_JSON", "false")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    # Same settings as FastAPI's JSONResponse, so both paths emit identical JSON
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """A response whose body is already encoded JSON."""
+    media_type = "application/json"
+
+
+def as_response(value: Union[bytes, Any], response: Optional[Response] = None) -> Any:
+    """Wraps pre-encoded JSON bytes in a response; other values pass through to FastAPI.
+
+    FastAPI only applies headers set on the injected ``response`` when the handler
+    returns plain data, so they are copied onto the raw response here.
+    """
+    if isinstance(value, bytes):
+        raw = RawJSONResponse(content=value)
+        if response is not None:
+            for key, header in response.headers.items():
+                if key not in ("content-length", "content-type"):
+                    raw.headers[key] = header
+        return raw
+    return value
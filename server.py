@@ -0,0 +1,91 @@
+"""Production entry point: one uvicorn worker process per CPU.
+
+    WEB_CONCURRENCY=8 DB_CONNECTION_BUDGET=200 python server.py
+
+Workers use uvloop and httptools when they are installed. With
+DB_CONNECTION_BUDGET set, every worker's pools are sized so that all
+workers together stay within that many connections per database server.
+On SIGTERM each worker reports not ready, finishes the requests in flight
+(for at most SHUTDOWN_TIMEOUT seconds) and closes its connections.
+"""
+import importlib.util
+import logging
+import os
+import sys
+from typing import Dict
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_count() -> int:
+    # CPUs this process may run on, fewer than os.cpu_count() under an affinity mask
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or _cpu_count()
+# Connections all workers together may open per database server (0 keeps DB_POOL_SIZE / DB_MAX_OVERFLOW)
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+# Seconds in-flight requests get to finish on shutdown before they are cancelled
+SHUTDOWN_TIMEOUT = int(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+# Same defaults as jobs.py, read here so the settings are not imported before they are set
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+
+def _split(connections: int) -> Dict[str, int]:
+    # Two thirds kept open, the rest as overflow, like the default 10 / 5
+    pool_size = max(1, connections * 2 // 3)
+    return {"pool_size": pool_size, "max_overflow": connections - pool_size}
+
+
+def plan_pools(budget: int, workers: int, job_workers: int = JOB_WORKERS) -> Dict[str, str]:
+    """Pool settings per worker, as environment variables, for a budget of connections per server.
+
+    On the primary every worker also holds its jobs pool (job_workers
+    connections) and the change push listener (one), so the request pool
+    gets what is left; each replica serves only request reads.
+    """
+    share = budget // workers
+    requests = share - job_workers - 1
+    if requests < 1:
+        raise SystemExit(f"DB_CONNECTION_BUDGET={budget} is too small for {workers} workers: "
+                         f"each needs at least {job_workers + 2} connections to the primary.")
+    primary, replica = _split(requests), _split(share)
+    return {
+        "DB_POOL_SIZE": str(primary["pool_size"]),
+        "DB_MAX_OVERFLOW": str(primary["max_overflow"]),
+        "REPLICA_POOL_SIZE": str(replica["pool_size"]),
+        "REPLICA_MAX_OVERFLOW": str(replica["max_overflow"]),
+    }
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(message)s")
+    if DB_CONNECTION_BUDGET:
+        # Inherited by the worker processes, which read them when database.py and replicas.py are imported
+        pools = plan_pools(DB_CONNECTION_BUDGET, WEB_CONCURRENCY)
+        os.environ.update(pools)
+        logger.info("Connection budget %d over %d workers: %s", DB_CONNECTION_BUDGET, WEB_CONCURRENCY,
+                    ", ".join(f"{name}={value}" for name, value in pools.items()))
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info("Starting %d workers on %s:%d with the %s loop and %s", WEB_CONCURRENCY, HOST, PORT, loop, http)
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import os
+
+
+def env_bool(name: str, default: str) -> bool:
+    """Reads a boolean setting; 1, true, yes and on (any case) are true."""
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import sys
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+import database
+from listing import KeysetLister, ListParams
+from settings import env_bool
+from versioning import read_version
+
+logger = logging.getLogger(__name__)
+
+# Serve list, detail and lookup reads from an in-memory copy of each master table
+SNAPSHOT_ENABLED = env_bool("SNAPSHOT_ENABLED", "false")
+
+
+class TableSnapshot:
+    """One master table at one version, stored column by column.
+
+    Rows keep the table's ID order (as sorted by Postgres, so keyset cursors
+    behave the same). Text columns are lists of interned strings, so repeated
+    values are stored once; isActive is two bitsets, the flag and whether it
+    is set at all, as NULL matches neither isActive filter in SQL.
+    """
+
+    def __init__(self, lister: KeysetLister, version: int, rows: List[tuple]):
+        self.lister = lister
+        self.version = version
+        count = len(rows)
+        # Interned per snapshot rather than with sys.intern, so a replaced
+        # snapshot's strings are freed with it
+        strings: Dict[str, str] = {}
+        self.ids: List[str] = [row[0] for row in rows]
+        self.names: List[Optional[str]] = [_intern(strings, row[1]) for row in rows]
+        self.abbreviations: List[Optional[str]] = [_intern(strings, row[2]) for row in rows]
+        self.descriptions: List[Optional[str]] = [_intern(strings, row[3]) for row in rows]
+        self.active = bytearray((count + 7) // 8)
+        self.active_set = bytearray((count + 7) // 8)
+        for i, row in enumerate(rows):
+            if row[4] is not None:
+                self.active_set[i >> 3] |= 1 << (i & 7)
+                if row[4]:
+                    self.active[i >> 3] |= 1 << (i & 7)
+        self.index: Dict[str, int] = {row_id: i for i, row_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _is_active(self, i: int) -> Optional[bool]:
+        if not self.active_set[i >> 3] >> (i & 7) & 1:
+            return None
+        return bool(self.active[i >> 3] >> (i & 7) & 1)
+
+    def _item(self, i: int, fields: List[str]) -> Dict[str, Any]:
+        values = {
+            self.lister.id_field: self.ids[i],
+            self.lister.name_field: self.names[i],
+            "abbreviation": self.abbreviations[i],
+            "description": self.descriptions[i],
+        }
+        item = {}
+        for field in fields:
+            if field == "isActive":
+                is_active = self._is_active(i)
+                item[field] = is_active if is_active is not None else True
+            else:
+                item[field] = values[field] if values[field] is not None else ""
+        return item
+
+    def item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        i = self.index.get(item_id)
+        return self._item(i, self.lister.fields) if i is not None else None
+
+    def page(self, params: ListParams) -> Optional[Dict[str, Any]]:
+        """Same page as the list query, or None when it has to come from Postgres
+        (a cursor that is not a current ID cannot be placed in the snapshot)."""
+        fields = self.lister.select_fields(params.fields)
+        start = 0
+        if params.after is not None:
+            position = self.index.get(params.after)
+            if position is None:
+                return None
+            start = position + 1
+        # Filters chained as generators, so the scan stops once the page is full
+        matches: Iterable[int] = range(start, len(self.ids))
+        if params.name:
+            matches = _with_prefix(matches, self.names, params.name)
+        if params.abbreviation:
+            matches = _with_prefix(matches, self.abbreviations, params.abbreviation)
+        if params.isActive is not None:
+            flags, flags_set, wanted = self.active, self.active_set, int(params.isActive)
+            matches = (i for i in matches
+                       if flags_set[i >> 3] >> (i & 7) & 1 and flags[i >> 3] >> (i & 7) & 1 == wanted)
+        # One extra match tells whether another page exists
+        matches = list(islice(matches, params.limit + 1))
+        next_cursor = None
+        if len(matches) > params.limit:
+            matches = matches[:params.limit]
+            next_cursor = self.ids[matches[-1]]
+        return {"message": "success", "data": [self._item(i, fields) for i in matches], "next_cursor": next_cursor}
+
+    def memory_bytes(self) -> int:
+        """Approximate size: the containers plus every distinct string they hold."""
+        size = sum(sys.getsizeof(column) for column in (
+            self.ids, self.names, self.abbreviations, self.descriptions, self.active, self.active_set, self.index))
+        seen = set()
+        for column in (self.ids, self.names, self.abbreviations, self.descriptions):
+            for value in column:
+                if value is not None and id(value) not in seen:
+                    seen.add(id(value))
+                    size += sys.getsizeof(value)
+        return size
+
+
+def _with_prefix(positions: Iterable[int], column: List[Optional[str]], prefix: str) -> Iterable[int]:
+    # NULL never matches a LIKE prefix
+    return (i for i in positions if (column[i] or "").startswith(prefix))
+
+
+def _intern(strings: Dict[str, str], value: Optional[str]) -> Optional[str]:
+    return strings.setdefault(value, value) if value is not None else None
+
+
+class SnapshotStore:
+    """The current snapshot of every registered table.
+
+    A snapshot only serves reads at the exact table version it was loaded at.
+    Newer versions (seen on a read, or announced by a change notification)
+    trigger a rebuild in the background; until the new snapshot is swapped
+    in, reads go to Postgres.
+    """
+
+    def __init__(self):
+        self.listers: Dict[str, KeysetLister] = {}
+        self.snapshots: Dict[str, TableSnapshot] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Tables changed again while their rebuild was running
+        self._stale: set = set()
+
+    def register(self, lister: KeysetLister):
+        self.listers[lister.table] = lister
+
+    def current(self, table: str, version: int) -> Optional[TableSnapshot]:
+        if not SNAPSHOT_ENABLED:
+            return None
+        snapshot = self.snapshots.get(table)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        if snapshot is None or snapshot.version < version:
+            self.refresh(table)
+        return None
+
+    def refresh(self, table: str):
+        if not SNAPSHOT_ENABLED or table not in self.listers:
+            return
+        if table in self._loading:
+            self._stale.add(table)
+            return
+        self._loading[table] = asyncio.create_task(self._rebuild(table))
+
+    async def _rebuild(self, table: str):
+        try:
+            while True:
+                self._stale.discard(table)
+                try:
+                    snapshot = await self._load(self.listers[table])
+                except (SQLAlchemyError, OSError) as e:
+                    logger.warning("Could not load the snapshot of %s: %s", table, e)
+                    return
+                # Swapped in whole; readers see either the old or the new snapshot
+                self.snapshots[table] = snapshot
+                if table not in self._stale:
+                    return
+        finally:
+            del self._loading[table]
+
+    async def _load(self, lister: KeysetLister) -> TableSnapshot:
+        query = text(f"SELECT {', '.join(lister.fields)} FROM {lister.table} ORDER BY {lister.order_by}")
+        async with database.init_engine().connect() as conn:
+            # The version and the rows come from the same MVCC snapshot
+            conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+            version = await read_version(conn, lister.table)
+            rows = (await conn.execute(query)).fetchall()
+        return TableSnapshot(lister, version, rows)
+
+    async def load_all(self):
+        for table in self.listers:
+            self.refresh(table)
+        await asyncio.gather(*self._loading.values(), return_exceptions=True)
+
+    async def close(self):
+        tasks = list(self._loading.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.snapshots.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for table, snapshot in self.snapshots.items():
+            size = snapshot.memory_bytes()
+            stats[table] = {
+                "version": snapshot.version,
+                "rows": len(snapshot),
+                "bytes": size,
+                "bytes_per_100k_rows": size * 100000 // len(snapshot) if len(snapshot) else 0,
+            }
+        return stats
+
+
+snapshots = SnapshotStore()
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Endpoint tests run against a throwaway Postgres database; its master tables
+# are emptied before every test. Without it only the unit tests run.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Read when database.py is imported, so it has to be set first
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+import cache  # noqa: E402
+import database  # noqa: E402
+import versioning  # noqa: E402
+from hierarchy import LINKS_TABLE  # noqa: E402
+
+# Table -> (ID column, name column), the schema the app expects to exist
+MASTER_TABLES = {
+    "noun_value_mstr": ("noun_id", "noun"),
+    "modifier_name_mstr": ("modifier_id", "modifier"),
+    "attri_name_mstr": ("modifier_id", "modifier"),
+    "attri_value_mstr": ("noun_id", "noun"),
+}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def reset_tables():
+    async with database.init_engine().begin() as conn:
+        for table, (id_field, name_field) in MASTER_TABLES.items():
+            await conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {id_field} VARCHAR PRIMARY KEY, {name_field} VARCHAR, abbreviation VARCHAR,
+                    description VARCHAR, isActive BOOLEAN
+                )
+            """))
+            await conn.execute(text(f"TRUNCATE {table}"))
+        await conn.execute(text(f"""
+            DO $$ BEGIN
+                IF to_regclass('{LINKS_TABLE}') IS NOT NULL THEN TRUNCATE {LINKS_TABLE}; END IF;
+            END $$
+        """))
+    # Versions are kept in the database, so only the in-process copies are dropped
+    for table_cache in cache._caches.values():
+        table_cache.clear()
+    for table in list(MASTER_TABLES) + ["hierarchy", LINKS_TABLE]:
+        versioning.forget_version(table)
+
+
+@pytest.fixture
+async def client():
+    """An HTTP client for the app, with the lifespan started and empty master tables."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from main import app
+    async with app.router.lifespan_context(app):
+        await reset_tables()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            yield c
+
+
+async def create_nouns(client: httpx.AsyncClient, *names: str, **fields) -> list:
+    """Creates one noun per name through the API and returns their IDs."""
+    ids = []
+    for name in names:
+        body = {"noun": name, "abbreviation": name[:3].upper(), "description": f"{name} description", "isActive": True}
+        body.update(fields)
+        response = await client.post("/nounvalue/nounvalue", json=body)
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["data"][0]["noun_id"])
+    return ids
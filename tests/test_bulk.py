@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException, Request
+
+from bulk import read_bulk_rows
+from conftest import create_nouns
+
+
+def request(body: bytes, content_type: str) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    return Request({"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]}, receive)
+
+
+@pytest.mark.anyio
+async def test_csv_only_turns_an_empty_id_into_none():
+    body = b"noun_id,noun,abbreviation,description,isActive\r\n,Bolt,BLT,,true\r\nN_0001,Nut,,,false\r\n"
+    rows = await read_bulk_rows(request(body, "text/csv"), "noun_id")
+    assert rows == [
+        {"noun_id": None, "noun": "Bolt", "abbreviation": "BLT", "description": "", "isActive": "true"},
+        {"noun_id": "N_0001", "noun": "Nut", "abbreviation": "", "description": "", "isActive": "false"},
+    ]
+
+
+@pytest.mark.anyio
+async def test_ndjson_and_json_bodies():
+    ndjson = await read_bulk_rows(request(b'{"noun": "Bolt"}\n\n{"noun": "Nut"}\n', "application/x-ndjson"), "noun_id")
+    assert ndjson == [{"noun": "Bolt"}, {"noun": "Nut"}]
+    assert await read_bulk_rows(request(b'[{"noun": "Bolt"}]', "application/json"), "noun_id") == [{"noun": "Bolt"}]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("body, content_type", [
+    (b"\xff\xfe not utf-8", "text/csv"),
+    (b'{"noun": "Bolt"}', "application/json"),
+    (b"[{", "application/json"),
+])
+async def test_malformed_bodies_are_rejected(body, content_type):
+    with pytest.raises(HTTPException) as error:
+        await read_bulk_rows(request(body, content_type), "noun_id")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_invalid_rows_are_reported_per_index(client):
+    [existing] = await create_nouns(client, "Bolt")
+    rows = [
+        {"noun": "Nut", "abbreviation": "NUT", "description": "", "isActive": True},
+        {"abbreviation": "X", "description": "", "isActive": True},
+        {"noun_id": existing, "noun": "Bolt M8", "abbreviation": "BLT", "description": "", "isActive": True},
+        {"noun_id": existing, "noun": "Bolt M9", "abbreviation": "BLT", "description": "", "isActive": True},
+        "not a row",
+    ]
+    body = (await client.post("/nounvalue/nounvalue/bulk", json=rows)).json()
+    assert (body["created"], body["updated"]) == (1, 1)
+    assert body["ids"][2] == existing and body["ids"][1] is None
+    assert {error["index"] for error in body["errors"]} == {1, 3, 4}
+    assert (await client.get(f"/nounvalue/nounvalue/{existing}")).json()["data"][0]["noun"] == "Bolt M8"
+
+
+@pytest.mark.anyio
+async def test_a_csv_export_can_be_imported_again(client):
+    await create_nouns(client, "Bolt", "Nut", description="")
+    export = await client.get("/nounvalue/nounvalue/export", params={"format": "csv"})
+    response = await client.post("/nounvalue/nounvalue/bulk", content=export.content,
+                                 headers={"content-type": "text/csv"})
+    body = response.json()
+    assert (body["created"], body["updated"], body["errors"]) == (0, 2, [])
+
+
+@pytest.mark.anyio
+async def test_an_empty_json_id_creates_a_row(client):
+    rows = [{"noun_id": "", "noun": name, "abbreviation": "BOL", "description": "", "isActive": True}
+            for name in ("Bolt", "Nut")]
+    body = (await client.post("/nounvalue/nounvalue/bulk", json=rows)).json()
+    # Not one row with the ID "" and a duplicate error for the other
+    assert (body["created"], body["errors"]) == (2, [])
+    assert all(row_id.startswith("N_") for row_id in body["ids"])
@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import create_nouns
+
+
+@pytest.mark.anyio
+async def test_bulk_delete_by_ids_reports_the_missing_ones(client):
+    bolt, nut, washer = await create_nouns(client, "Bolt", "Nut", "Washer")
+    body = (await client.post("/nounvalue/nounvalue/bulk/delete", json={"ids": [bolt, washer, "N_9999"]})).json()
+    assert sorted(body["ids"]) == sorted([bolt, washer])
+    assert body["not_found"] == ["N_9999"]
+    remaining = (await client.get("/nounvalue/nounvalue")).json()["data"]
+    assert [item["noun_id"] for item in remaining] == [nut]
+
+
+@pytest.mark.anyio
+async def test_bulk_active_by_filter(client):
+    bolt, bolster, nut = await create_nouns(client, "Bolt", "Bolster", "Nut")
+    body = (await client.post("/nounvalue/nounvalue/bulk/active",
+                              json={"filter": {"name": "Bol"}, "isActive": False})).json()
+    assert sorted(body["ids"]) == sorted([bolt, bolster])
+    inactive = (await client.get("/nounvalue/nounvalue", params={"isActive": "false"})).json()["data"]
+    assert sorted(item["noun_id"] for item in inactive) == sorted([bolt, bolster])
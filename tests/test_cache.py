@@ -0,0 +1,58 @@
+import pytest
+
+import cache
+from cache import TTLCache
+from conftest import create_nouns
+
+
+def test_least_recently_used_entry_is_evicted():
+    entries = TTLCache("test", max_entries=2, ttl=60)
+    entries.set("a", 1, entries.generation)
+    entries.set("b", 2, entries.generation)
+    assert entries.get("a") == 1
+    entries.set("c", 3, entries.generation)
+    assert entries.get("b") is None
+    assert (entries.get("a"), entries.get("c")) == (1, 3)
+    assert entries.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    entries = TTLCache("test", ttl=5)
+    entries.set("a", 1, entries.generation)
+    now[0] += 4
+    assert entries.get("a") == 1
+    now[0] += 2
+    assert entries.get("a") is None
+    assert entries.stats()["size"] == 0
+
+
+def test_a_load_that_raced_with_a_clear_is_not_stored():
+    entries = TTLCache("test")
+    generation = entries.generation
+    # A write clears the cache while the read is still loading
+    entries.clear()
+    entries.set("a", "stale", generation)
+    assert entries.get("a") is None
+    entries.set("a", "fresh", entries.generation)
+    assert entries.get("a") == "fresh"
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_ENABLED", False)
+    entries = TTLCache("test")
+    entries.set("a", 1, entries.generation)
+    assert entries.get("a") is None
+
+
+@pytest.mark.anyio
+async def test_writes_invalidate_cached_reads(client):
+    [noun_id] = await create_nouns(client, "Bolt")
+    stats = cache.get_cache("noun_value_mstr").stats
+    await client.get(f"/nounvalue/nounvalue/{noun_id}")
+    hits = stats()["hits"]
+    assert (await client.get(f"/nounvalue/nounvalue/{noun_id}")).json()["data"][0]["noun"] == "Bolt"
+    assert stats()["hits"] == hits + 1
+    await client.put(f"/nounvalue/nounvalue/{noun_id}", json={"noun": "Bolt M8"})
+    assert (await client.get(f"/nounvalue/nounvalue/{noun_id}")).json()["data"][0]["noun"] == "Bolt M8"
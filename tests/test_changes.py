@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import changes
+from conftest import create_nouns
+
+
+def test_parse_token():
+    assert changes.parse_token("812-40") == (812, 40)
+    for token in ("812", "812-40-1", "a-b", ""):
+        with pytest.raises(HTTPException) as error:
+            changes.parse_token(token)
+        assert error.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_no_ddl_runs_when_trigger_install_is_off(monkeypatch):
+    monkeypatch.setattr(changes, "CHANGES_INSTALL_TRIGGERS", False)
+    monkeypatch.setattr(changes, "_ready", False)
+    monkeypatch.setattr(changes.database, "init_engine", lambda: pytest.fail("no connection expected"))
+    await changes.ensure_changelog()
+    assert changes._ready
+
+
+@pytest.mark.anyio
+async def test_maintenance_survives_an_unreachable_database(monkeypatch):
+    async def refused():
+        raise ConnectionRefusedError("connection refused")
+
+    async def stop(seconds):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(changes, "ensure_changelog", refused)
+    monkeypatch.setattr(changes.asyncio, "sleep", stop)
+    # The error is logged and the loop goes on to wait for the next attempt
+    with pytest.raises(asyncio.CancelledError):
+        await changes.maintain_changelog()
+
+
+@pytest.mark.anyio
+async def test_feed_returns_creates_updates_and_tombstones_after_the_token(client):
+    [kept] = await create_nouns(client, "Bolt")
+    since = (await client.get("/changes")).json()["next_since"]
+
+    [created, deleted] = await create_nouns(client, "Nut", "Washer")
+    await client.patch(f"/nounvalue/nounvalue/{kept}", json={"description": "M8 hex"})
+    await client.delete(f"/nounvalue/nounvalue/{deleted}")
+
+    page = (await client.get("/changes", params={"since": since})).json()
+    assert [(c["id"], c["operation"]) for c in page["changes"]] == [
+        (created, "create"), (kept, "update"), (deleted, "delete")]
+    assert page["changes"][1]["data"]["description"] == "M8 hex"
+    assert page["changes"][2]["data"] is None and not page["has_more"]
+
+    # One change per page: a row is listed again for each page it changed in
+    token, ids = since, []
+    while True:
+        page = (await client.get("/changes", params={"since": token, "limit": 1})).json()
+        ids += [c["id"] for c in page["changes"]]
+        token = page["next_since"]
+        if not page["has_more"]:
+            break
+    assert ids == [created, deleted, kept, deleted]
+
+
+@pytest.mark.anyio
+async def test_malformed_pruned_and_unknown(client):
+    assert (await client.get("/changes", params={"since": "latest"})).status_code == 400
+    # No change has this ID any more, as after a prune
+    assert (await client.get("/changes", params={"since": "1-999999999"})).status_code == 410
+    assert (await client.get("/changes", params={"tables": "price_mstr"})).status_code == 400
@@ -0,0 +1,104 @@
+import gzip
+import json
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import compression
+from compression import CompressionMiddleware, Payload, negotiate
+from conftest import create_nouns
+
+LARGE = {"data": [{"noun": "Bolt", "description": "Hex bolt"}] * 100}
+
+
+@pytest.fixture
+def encodings(monkeypatch):
+    """Sets the encodings the server supports, so results do not depend on whether brotli is installed."""
+    def use(*names):
+        monkeypatch.setattr(compression, "ENCODINGS", names)
+        negotiate.cache_clear()
+    yield use
+    # Drops answers negotiated with the patched encodings
+    negotiate.cache_clear()
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0", None),
+    ("*, gzip;q=0", None),
+    ("gzip;q=oops", None),
+    ("deflate", None),
+    ("", None),
+])
+def test_negotiate(accept_encoding, encoding, encodings):
+    encodings("gzip")
+    assert negotiate(accept_encoding) == encoding
+
+
+def test_negotiate_prefers_brotli_unless_weighted_lower(encodings):
+    encodings("br", "gzip")
+    assert negotiate("gzip, br") == "br"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+
+
+def test_payload_compresses_each_encoding_once():
+    payload = Payload(json.dumps(LARGE).encode())
+    first = payload.encoded("gzip")
+    assert payload.encoded("gzip") is first
+    assert json.loads(gzip.decompress(first)) == LARGE
+
+
+def app() -> CompressionMiddleware:
+    async def stream():
+        for chunk in (b"[", b"1,", b"2]"):
+            yield chunk
+
+    return CompressionMiddleware(Starlette(routes=[
+        Route("/large", lambda request: JSONResponse(LARGE)),
+        Route("/small", lambda request: JSONResponse({"message": "success"})),
+        Route("/binary", lambda request: Response(b"\0" * 4096, media_type="application/octet-stream")),
+        Route("/stream", lambda request: StreamingResponse(stream(), media_type="application/json")),
+        Route("/events", lambda request: StreamingResponse(stream(), media_type="text/event-stream")),
+    ]))
+
+
+@pytest.mark.anyio
+async def test_middleware_compresses_only_what_is_worth_it():
+    transport = httpx.ASGITransport(app=app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/large", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip" and response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(json.dumps(LARGE))
+        assert response.json() == LARGE
+
+        response = await client.get("/stream", headers={"accept-encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip" and response.json() == [1, 2]
+
+        for path in ("/small", "/binary", "/events"):
+            response = await client.get(path, headers={"accept-encoding": "gzip"})
+            assert "content-encoding" not in response.headers, path
+        response = await client.get("/large", headers={"accept-encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_cached_list_pages_are_sent_precompressed(client):
+    await client.post("/nounvalue/nounvalue/bulk", json=[
+        {"noun": f"Noun {i}", "abbreviation": "NOU", "description": "A noun", "isActive": True} for i in range(50)])
+    # httpx asks for gzip by default
+    plain = await client.get("/nounvalue/nounvalue", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    compressed = await client.get("/nounvalue/nounvalue", headers={"accept-encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+
+    [noun_id] = await create_nouns(client, "Bolt")
+    small = await client.get(f"/nounvalue/nounvalue/{noun_id}", headers={"accept-encoding": "gzip"})
+    assert small.status_code == 200 and "content-encoding" not in small.headers
@@ -0,0 +1,29 @@
+import pytest
+
+import database
+
+
+@pytest.mark.anyio
+async def test_one_engine_per_process_with_the_configured_pool(monkeypatch):
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "SessionLocal", None)
+    engine = database.init_engine("postgresql+asyncpg://postgres@127.0.0.1:1/postgres")
+    try:
+        assert database.init_engine() is engine
+        assert engine.pool.size() == database.DB_POOL_SIZE
+        assert engine.pool._max_overflow == database.DB_MAX_OVERFLOW
+        # get_db hands out sessions of the shared engine, created lazily if the lifespan did not
+        async for session in database.get_db():
+            assert session.bind is engine
+    finally:
+        await database.dispose_engine()
+    assert database.engine is None and database.SessionLocal is None
+
+
+@pytest.mark.anyio
+async def test_requests_reuse_pooled_connections(client):
+    pool = database.engine.pool
+    for _ in range(3):
+        assert (await client.get("/nounvalue/nounvalue")).status_code == 200
+    # Warm-up filled the pool; the requests borrowed from it rather than opening more
+    assert pool.checkedout() == 0 and pool.overflow() <= 0
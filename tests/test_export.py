@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from conftest import create_nouns
+from export import _encode_csv, _encode_ndjson
+
+
+async def batches(*pages):
+    for page in pages:
+        yield page
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.anyio
+async def test_ndjson_is_compact_one_object_per_line():
+    body = await collect(_encode_ndjson(batches([{"noun_id": "N_0001", "noun": "Bolt"}], [{"noun_id": "N_0002",
+                                                                                          "noun": "Écrou"}])))
+    assert body == '{"noun_id":"N_0001","noun":"Bolt"}\n{"noun_id":"N_0002","noun":"Écrou"}\n'.encode("utf-8")
+
+
+@pytest.mark.anyio
+async def test_csv_sends_the_header_first():
+    chunks = _encode_csv(["noun_id", "noun"], batches([{"noun_id": "N_0001", "noun": "Bolt, M8"}]))
+    assert await chunks.__anext__() == b"noun_id,noun\r\n"
+    assert await collect(chunks) == b'N_0001,"Bolt, M8"\r\n'
+
+
+@pytest.mark.anyio
+async def test_export_streams_the_filtered_table(client):
+    await create_nouns(client, "Bolt", "Nut")
+    await create_nouns(client, "Washer", isActive=False)
+    response = await client.get("/nounvalue/nounvalue/export", params={"isActive": "true"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["noun"] for line in response.text.splitlines()] == ["Bolt", "Nut"]
+    csv = await client.get("/nounvalue/nounvalue/export", params={"format": "csv"})
+    assert csv.text.splitlines()[0] == "noun_id,noun,abbreviation,description,isActive"
+    assert len(csv.text.splitlines()) == 4
@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import create_nouns
+from hierarchy import build_tree
+
+
+def node_row(*nodes) -> tuple:
+    """A path row: (id, name) per level from the noun down, NULL-padded to all four levels."""
+    row = ()
+    for node_id, name in nodes:
+        row += (node_id, name, name[:3].upper(), None, True)
+    return row + (None,) * 5 * (4 - len(nodes))
+
+
+def test_build_tree_nests_each_path_once():
+    tree = build_tree([
+        node_row(("N_1", "Bolt"), ("M_1", "Hex"), ("M_5", "Size"), ("N_7", "M8")),
+        node_row(("N_1", "Bolt"), ("M_1", "Hex"), ("M_5", "Size"), ("N_8", "M10")),
+        node_row(("N_1", "Bolt"), ("M_2", "Carriage")),
+        node_row(("N_2", "Nut")),
+    ])
+    assert [noun["noun_id"] for noun in tree] == ["N_1", "N_2"]
+    bolt, nut = tree
+    assert [modifier["modifier_id"] for modifier in bolt["modifiers"]] == ["M_1", "M_2"]
+    [size] = bolt["modifiers"][0]["attribute_names"]
+    assert [value["noun"] for value in size["attribute_values"]] == ["M8", "M10"]
+    assert "attribute_values" not in size["attribute_values"][0]
+    assert bolt["modifiers"][1]["attribute_names"] == [] and nut["modifiers"] == []
+    # NULL text columns become empty strings
+    assert nut["description"] == ""
+
+
+def test_a_child_under_two_parents_appears_under_both():
+    tree = build_tree([node_row(("N_1", "Bolt"), ("M_1", "Hex")), node_row(("N_2", "Screw"), ("M_1", "Hex"))])
+    assert [noun["modifiers"][0]["modifier_id"] for noun in tree] == ["M_1", "M_1"]
+    assert tree[0]["modifiers"][0] is not tree[1]["modifiers"][0]
+
+
+@pytest.mark.anyio
+async def test_links_show_up_in_the_tree(client):
+    [bolt] = await create_nouns(client, "Bolt")
+    response = await client.post("/modifiers/modifiers", json={"modifier": "Hex", "abbreviation": "HEX",
+                                                               "description": "Hex head", "isActive": True})
+    modifier_id = response.json()["data"][0]["modifier_id"]
+
+    response = await client.post("/hierarchy/links", json={"level": "modifier", "parent_id": bolt,
+                                                           "child_ids": [modifier_id, "M_9999"]})
+    assert response.json()["ids"] == [modifier_id] and response.json()["not_found"] == ["M_9999"]
+    tree = (await client.get(f"/hierarchy/{bolt}")).json()["data"]
+    assert [modifier["modifier"] for modifier in tree[0]["modifiers"]] == ["Hex"]
+
+    await client.patch(f"/modifiers/modifiers/{modifier_id}", json={"isActive": False})
+    tree = (await client.get(f"/hierarchy/{bolt}", params={"active_only": "true"})).json()["data"]
+    assert tree[0]["modifiers"] == []
+
+    await client.post("/hierarchy/links/delete", json={"level": "modifier", "parent_id": bolt,
+                                                       "child_ids": [modifier_id]})
+    assert (await client.get("/hierarchy")).json()["data"][0]["modifiers"] == []
+
+
+@pytest.mark.anyio
+async def test_missing_noun_or_parent_is_404(client):
+    assert (await client.get("/hierarchy/N_9999")).status_code == 404
+    response = await client.post("/hierarchy/links", json={"level": "modifier", "parent_id": "N_9999",
+                                                           "child_ids": []})
+    assert response.status_code == 404
@@ -0,0 +1,63 @@
+import itertools
+
+import pytest
+
+from conftest import create_nouns
+from id_allocator import IdAllocator, SequenceIdAllocator
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeSequence:
+    """Stands in for the session: nextval() of a sequence that increments by the block size."""
+
+    def __init__(self, block_size: int, start: int = 1):
+        self.values = itertools.count(start, block_size)
+        self.calls = []
+
+    async def execute(self, statement, bind):
+        self.calls.append(bind["blocks"])
+        return FakeResult([(next(self.values),) for _ in range(bind["blocks"])])
+
+
+def allocator(block_size: int) -> SequenceIdAllocator:
+    allocator = SequenceIdAllocator("N", "noun_value_mstr", "noun_id", block_size=block_size)
+    # The sequence itself is not needed
+    allocator._ready = True
+    return allocator
+
+
+def test_allocator_interface_is_abstract():
+    with pytest.raises(TypeError):
+        IdAllocator()
+
+
+@pytest.mark.anyio
+async def test_ids_are_handed_out_from_reserved_blocks():
+    ids, db = allocator(3), FakeSequence(3)
+    # Two blocks in one round trip: 1-3 and 4-6, of which 6 is kept
+    assert await ids.reserve(db, 5) == ["N_0001", "N_0002", "N_0003", "N_0004", "N_0005"]
+    assert db.calls == [2]
+    assert await ids.next_id(db) == "N_0006"
+    assert db.calls == [2]
+    assert await ids.reserve(db, 2) == ["N_0007", "N_0008"]
+    assert db.calls == [2, 1]
+
+
+@pytest.mark.anyio
+async def test_ids_grow_past_the_pad_width():
+    ids = allocator(20)
+    assert await ids.reserve(FakeSequence(20, start=9999), 2) == ["N_9999", "N_10000"]
+
+
+@pytest.mark.anyio
+async def test_created_rows_get_unique_sequential_ids(client):
+    ids = await create_nouns(client, "Bolt", "Nut", "Washer")
+    assert len(set(ids)) == 3 and all(i.startswith("N_") for i in ids)
+    assert ids == sorted(ids)
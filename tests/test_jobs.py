@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+import database
+import jobs
+from conftest import create_nouns
+
+
+async def finished(client, job_id: str) -> dict:
+    """Polls the job until it is no longer queued or running."""
+    for _ in range(100):
+        status = (await client.get(f"/jobs/{job_id}")).json()
+        if status["status"] in jobs.FINISHED:
+            return status
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.mark.anyio
+async def test_import_job_reports_progress_and_the_bulk_response(client):
+    rows = [{"noun": "Bolt", "abbreviation": "BOL", "description": "Hex bolt", "isActive": True},
+            {"noun": "Nut", "abbreviation": "NUT", "description": "Hex nut", "isActive": "maybe"}]
+    response = await client.post("/jobs/import", params={"table": "noun_value_mstr"}, json=rows)
+    assert response.status_code == 202 and response.json()["status"] == "queued"
+
+    status = await finished(client, response.json()["id"])
+    assert status["status"] == "succeeded"
+    assert status["result"] == {"created": 1, "updated": 0, "errors": 1}
+    # Progress counts the rows written; the invalid one is only reported
+    assert status["progress"] == {"done": 1, "total": 1}
+    result = (await client.get(f"/jobs/{status['id']}/result")).json()
+    assert [error["index"] for error in result["errors"]] == [1]
+
+
+@pytest.mark.anyio
+async def test_export_job_result_is_the_export_file(client):
+    await create_nouns(client, "Bolt", "Nut")
+    response = await client.post("/jobs/export", params={"table": "noun_value_mstr", "format": "ndjson"})
+    status = await finished(client, response.json()["id"])
+    assert status["result"] == {"rows": 2}
+
+    result = await client.get(f"/jobs/{status['id']}/result")
+    assert result.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["noun"] for line in result.content.splitlines()] == ["Bolt", "Nut"]
+
+
+@pytest.mark.anyio
+async def test_unknown_tables_and_jobs(client):
+    assert (await client.post("/jobs/export", params={"table": "price_mstr"})).status_code == 400
+    assert (await client.get("/jobs/00")).status_code == 404
+    assert (await client.get("/jobs/00/result")).status_code == 404
+    assert (await client.post("/jobs/00/cancel")).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_a_job_that_cannot_be_recorded_is_not_queued(client, monkeypatch):
+    engine = database.build_engine("postgresql+asyncpg://postgres@127.0.0.1:1/postgres", "unreachable", 1, 0)
+    monkeypatch.setattr(jobs, "JOB_PERSIST", True)
+    monkeypatch.setattr(jobs, "_ready", False)
+    monkeypatch.setattr(jobs, "_engine", engine)
+    known = set(jobs._jobs)
+    try:
+        response = await client.post("/jobs/export", params={"table": "noun_value_mstr"})
+    finally:
+        await engine.dispose()
+    assert response.status_code == 503 and response.headers["retry-after"] == "30"
+    assert set(jobs._jobs) == known and jobs._queue.empty()
+
+
+@pytest.mark.anyio
+async def test_persisted_jobs_are_recorded_before_they_run(client, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_PERSIST", True)
+    response = await client.post("/jobs/export", params={"table": "noun_value_mstr"})
+    job_id = response.json()["id"]
+    async with database.init_engine().connect() as conn:
+        assert (await conn.execute(jobs.GET_JOB, {"id": job_id})).first() is not None
+    assert (await finished(client, job_id))["status"] == "succeeded"
@@ -0,0 +1,76 @@
+import signal
+
+import pytest
+from sqlalchemy import text
+
+import database
+import lifecycle
+from lifecycle import Lifecycle
+
+# Nothing listens on port 1, so connecting fails with ConnectionRefusedError
+UNREACHABLE_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/postgres"
+
+
+@pytest.fixture
+async def unreachable_database(monkeypatch):
+    engine = database.build_engine(UNREACHABLE_URL, "unreachable", pool_size=1, max_overflow=0)
+    monkeypatch.setattr(database, "init_engine", lambda: engine)
+    monkeypatch.setattr(database, "SessionLocal", database.make_sessionmaker(engine))
+    monkeypatch.setattr(lifecycle, "replicas", [])
+    yield
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_worker_starts_unready_without_the_database_and_keeps_warming_up(unreachable_database, monkeypatch):
+    monkeypatch.setattr(lifecycle, "WARMUP_RETRY_SECONDS", 0)
+    worker = Lifecycle()
+    attempts = []
+
+    async def warm(db):
+        attempts.append(db)
+        if len(attempts) < 3:
+            await db.execute(text("SELECT 1"))
+
+    worker.register_warmup(warm)
+    await worker.warm_up()
+    assert not worker.ready
+    # The third attempt gets through, as once the database is back
+    await worker._retry
+    assert worker.ready and len(attempts) == 3
+    await worker.stop()
+
+
+@pytest.mark.anyio
+async def test_stop_cancels_the_retries(unreachable_database, monkeypatch):
+    monkeypatch.setattr(lifecycle, "WARMUP_RETRY_SECONDS", 60)
+
+    async def warm(db):
+        await db.execute(text("SELECT 1"))
+
+    worker = Lifecycle()
+    worker.register_warmup(warm)
+    await worker.warm_up()
+    retry = worker._retry
+    await worker.stop()
+    assert retry.cancelled() and not worker.ready
+
+
+def test_drain_runs_before_the_previous_handler_and_is_installed_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(signal, "getsignal", lambda sig: handlers[sig])
+    monkeypatch.setattr(signal, "signal", lambda sig, handler: handlers.__setitem__(sig, handler))
+    handlers = {signal.SIGINT: lambda signum, frame: calls.append("server"),
+                signal.SIGTERM: lambda signum, frame: calls.append("server")}
+    worker = Lifecycle()
+    worker.on_drain.append(lambda: calls.append("never, no loop yet"))
+    worker.watch_signals()
+    worker.watch_signals()
+    handlers[signal.SIGTERM](signal.SIGTERM, None)
+    assert calls == ["server"] and worker.draining and not worker.ready
+
+
+@pytest.mark.anyio
+async def test_ready_after_startup(client):
+    response = await client.get("/ready")
+    assert response.status_code == 200 and response.json() == {"status": "ready"}
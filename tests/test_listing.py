@@ -0,0 +1,89 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+import database
+
+from conftest import create_nouns
+from listing import LIST_DEFAULT_LIMIT, KeysetLister, ListParams, like_prefix
+
+
+def params(**overrides) -> ListParams:
+    values = dict(after=None, limit=LIST_DEFAULT_LIMIT, isActive=None, name=None, abbreviation=None, fields=None)
+    values.update(overrides)
+    return ListParams(**values)
+
+
+def test_like_prefix_escapes_wildcards():
+    assert like_prefix("Bo%l_t\\") == "Bo\\%l\\_t\\\\%"
+
+
+def test_fields_are_parsed_and_the_id_is_always_selected():
+    lister = KeysetLister("noun_value_mstr", "noun_id", "noun")
+    assert params(fields=" noun , isActive,").fields == ["noun", "isActive"]
+    assert lister.select_fields(["isActive", "noun"]) == ["noun_id", "noun", "isActive"]
+    assert lister.select_fields(None) == lister.fields
+    with pytest.raises(HTTPException) as error:
+        lister.select_fields(["price"])
+    assert error.value.status_code == 400
+
+
+def test_query_continues_after_the_cursor_and_fetches_one_extra_row():
+    lister = KeysetLister("noun_value_mstr", "noun_id", "noun")
+    query, bind = lister.build_query(params(after="N_0010", limit=5, name="Bo"))
+    assert "(length(noun_id), noun_id) > (length(:after), :after)" in str(query)
+    assert "ORDER BY length(noun_id), noun_id" in str(query)
+    assert bind == {"name_prefix": "Bo%", "limit": 6, "after": "N_0010"}
+    # Same shape, same statement
+    assert lister.build_query(params(after="N_0020", limit=7, name="Nut"))[0] is query
+
+
+def test_cache_key_distinguishes_every_parameter():
+    keys = {params().cache_key(), params(after="N_0001").cache_key(), params(limit=5).cache_key(),
+            params(isActive=True).cache_key(), params(name="B").cache_key(), params(abbreviation="B").cache_key(),
+            params(fields="noun").cache_key()}
+    assert len(keys) == 7
+
+
+@pytest.mark.anyio
+async def test_next_cursor_walks_every_row_once(client):
+    ids = await create_nouns(client, *(f"Noun {i}" for i in range(7)))
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 3} if cursor is None else {"limit": 3, "after": cursor}
+        page = (await client.get("/nounvalue/nounvalue", params=query)).json()
+        seen.extend(item["noun_id"] for item in page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(ids)
+
+
+@pytest.mark.anyio
+async def test_filters_and_field_projection(client):
+    await create_nouns(client, "Bolt", "Bolster", "Nut")
+    await create_nouns(client, "Bollard", isActive=False)
+    page = (await client.get("/nounvalue/nounvalue", params={"name": "Bol", "isActive": "true",
+                                                              "fields": "noun"})).json()
+    assert [item["noun"] for item in page["data"]] == ["Bolt", "Bolster"]
+    assert set(page["data"][0]) == {"noun_id", "noun"}
+    assert (await client.get("/nounvalue/nounvalue", params={"fields": "price"})).status_code == 400
+
+
+@pytest.mark.anyio
+async def test_ids_past_the_pad_width_keep_their_numeric_order(client):
+    async with database.init_engine().begin() as conn:
+        for noun_id in ("N_10000", "N_9999", "N_100000", "N_0002"):
+            await conn.execute(text("INSERT INTO noun_value_mstr VALUES (:id, 'Bolt', 'BOL', 'Hex bolt', TRUE)"),
+                               {"id": noun_id})
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 1} if cursor is None else {"limit": 1, "after": cursor}
+        page = (await client.get("/nounvalue/nounvalue", params=query)).json()
+        seen.extend(item["noun_id"] for item in page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["N_0002", "N_9999", "N_10000", "N_100000"]
+    export = (await client.get("/nounvalue/nounvalue/export", params={"format": "csv"})).text.splitlines()
+    assert [line.split(",")[0] for line in export[1:]] == seen
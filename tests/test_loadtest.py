@@ -0,0 +1,56 @@
+import os
+from urllib.parse import urlsplit
+
+import pytest
+
+from bench.loadtest import _percentile, compare
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert _percentile(values, 50) == 50.0
+    assert _percentile(values, 95) == 95.0
+    assert _percentile(values, 100) == 100.0
+    assert _percentile([], 95) == 0.0
+
+
+def test_compare_reports_only_regressions_beyond_the_threshold():
+    baseline = {"results": {
+        "list": {"p95_ms": 10.0, "throughput_rps": 1000.0},
+        "detail": {"p95_ms": 5.0, "throughput_rps": 2000.0},
+    }}
+    results = {"results": {
+        "list": {"p95_ms": 10.9, "throughput_rps": 950.0},
+        "detail": {"p95_ms": 6.0, "throughput_rps": 1500.0},
+        "search": {"p95_ms": 50.0, "throughput_rps": 10.0},
+    }}
+    assert compare(results, baseline, threshold=0.1) == [
+        "detail: p95 5.0 ms -> 6.0 ms",
+        "detail: throughput 2000.0 -> 1500.0 req/s",
+    ]
+
+
+def http_requests():
+    """(method, path with query, JSON body or None) of every request in test_main.http."""
+    with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), "test_main.http")) as f:
+        blocks = f.read().split("###")
+    for block in blocks:
+        lines = [line for line in block.strip().splitlines() if line and not line.startswith("#")]
+        if lines:
+            method, url = lines[0].split(" ", 1)
+            url = urlsplit(url)
+            body = lines[-1] if lines[-1].startswith("{") else None
+            yield method, f"{url.path}?{url.query}" if url.query else url.path, body
+
+
+@pytest.mark.anyio
+async def test_every_request_in_test_main_http_reaches_a_route(client):
+    requests = list(http_requests())
+    assert requests
+    for method, path, body in requests:
+        response = await client.request(method, path, content=body, headers={"content-type": "application/json"})
+        # Unknown paths get FastAPI's generic 404, missing rows the app's own message
+        if response.status_code == 404:
+            assert response.json()["detail"] != "Not Found", path
+        else:
+            assert response.status_code < 400, (path, response.text)
@@ -0,0 +1,33 @@
+import pytest
+
+import master_router
+from conftest import create_nouns
+
+
+@pytest.mark.anyio
+async def test_lookup_maps_found_ids_and_lists_the_missing(client):
+    bolt, nut = await create_nouns(client, "Bolt", "Nut")
+    response = await client.post("/nounvalue/nounvalue/lookup", json={"ids": [nut, "N_9999", bolt, nut]})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["data"]) == {bolt, nut} and body["data"][nut]["noun"] == "Nut"
+    # Duplicates are resolved once
+    assert body["missing"] == ["N_9999"]
+
+
+@pytest.mark.anyio
+async def test_lookup_json_is_the_same_on_the_fast_path(client, monkeypatch):
+    [bolt] = await create_nouns(client, "Bolt")
+    model = (await client.post("/nounvalue/nounvalue/lookup", json={"ids": [bolt, "N_9999"]})).json()
+    monkeypatch.setattr(master_router, "FAST_JSON", True)
+    assert (await client.post("/nounvalue/nounvalue/lookup", json={"ids": [bolt, "N_9999"]})).json() == model
+
+
+@pytest.mark.anyio
+async def test_too_many_ids_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(master_router, "LOOKUP_MAX_IDS", 2)
+    response = await client.post("/nounvalue/nounvalue/lookup", json={"ids": ["N_0001", "N_0002", "N_0003"]})
+    assert response.status_code == 400
+    # Repeated IDs count once
+    response = await client.post("/nounvalue/nounvalue/lookup", json={"ids": ["N_0001", "N_0002", "N_0001"]})
+    assert response.status_code == 200
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import ARRAY, Boolean, String
+from sqlalchemy.dialects import postgresql
+
+import database
+from master_query import compile_statements
+
+statements = compile_statements("noun_value_mstr", "noun_id", "noun")
+
+
+def bind_types(statement) -> dict:
+    compiled = statement.compile(dialect=postgresql.asyncpg.dialect())
+    return {name: type(bind.type) for name, bind in compiled.binds.items()}
+
+
+def test_only_the_binds_a_statement_uses_are_declared():
+    # :id must not also match :ids, and the reverse
+    assert bind_types(statements.get_by_id) == {"id": String}
+    assert bind_types(statements.lookup) == {"ids": ARRAY}
+    assert bind_types(statements.delete) == {"id": String}
+    assert bind_types(statements.update) == {"id": String, "name": String, "abbreviation": String,
+                                              "description": String, "isActive": Boolean}
+
+
+def test_row_statements_declare_their_result_columns():
+    columns = {column.name: type(column.type) for column in statements.create.selected_columns}
+    assert columns == {"noun_id": String, "noun": String, "abbreviation": String, "description": String,
+                       "isActive": Boolean}
+    assert not hasattr(statements.delete, "selected_columns")
+
+
+@pytest.mark.anyio
+async def test_statements_run_repeatedly_on_one_connection(client):
+    row = {"id": "N_0001", "name": "Bolt", "abbreviation": "BOL", "description": "Hex bolt", "isActive": True}
+    async with database.SessionLocal() as db:
+        await db.execute(statements.create, row)
+        for _ in range(3):
+            # NULLs keep the current value, whatever the bind's position in the statement
+            updated = (await db.execute(statements.update, {**row, "name": None, "isActive": False})).one()
+            assert (updated.noun, updated.isActive) == ("Bolt", False)
+        found = (await db.execute(statements.lookup, {"ids": ["N_0001", "N_0002"]})).all()
+        assert [r.noun_id for r in found] == ["N_0001"]
+        assert (await db.execute(statements.delete, {"id": "N_0001"})).scalar() == "N_0001"
+        assert (await db.execute(statements.get_by_id, {"id": "N_0001"})).first() is None
+        await db.rollback()
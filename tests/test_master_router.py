@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import MASTER_TABLES
+from master_router import _model_stem
+
+# Table -> (path, ID prefix), as the routers are included in main.py
+ROUTES = {
+    "modifier_name_mstr": ("/modifiers/modifiers", "M"),
+    "noun_value_mstr": ("/nounvalue/nounvalue", "N"),
+    "attri_name_mstr": ("/attributename/attributename", "M"),
+    "attri_value_mstr": ("/attributevalue/attributevalue", "N"),
+}
+
+
+def test_model_stem():
+    assert _model_stem("noun_value_mstr") == "NounValue"
+    assert _model_stem("attri_name_mstr") == "AttriName"
+
+
+def test_every_table_gets_the_same_routes_and_its_own_models():
+    from main import app
+    schema = app.openapi()
+    for table, (path, _) in ROUTES.items():
+        assert {route: sorted(methods) for route, methods in schema["paths"].items() if route.startswith(path)} == {
+            path: ["get", "post"],
+            f"{path}/export": ["get"],
+            f"{path}/search": ["get"],
+            f"{path}/lookup": ["post"],
+            f"{path}/bulk": ["post"],
+            f"{path}/bulk/delete": ["post"],
+            f"{path}/bulk/active": ["post"],
+            f"{path}/{{item_id}}": ["delete", "get", "patch", "put"],
+        }
+        create = schema["components"]["schemas"][f"{_model_stem(table)}Create"]
+        assert sorted(create["required"]) == sorted([MASTER_TABLES[table][1], "abbreviation", "description",
+                                                     "isActive"])
+
+
+@pytest.mark.anyio
+async def test_create_read_and_delete_in_every_table(client):
+    for table, (path, id_prefix) in ROUTES.items():
+        id_field, name_field = MASTER_TABLES[table]
+        body = {name_field: "Bolt", "abbreviation": "BLT", "description": "Hex bolt", "isActive": True}
+        response = await client.post(path, json=body)
+        assert response.status_code == 200, response.text
+        [item] = response.json()["data"]
+        item_id = item.pop(id_field)
+        assert item_id.startswith(f"{id_prefix}_") and item == body
+        assert (await client.get(f"{path}/{item_id}")).json()["data"][0][name_field] == "Bolt"
+        assert (await client.delete(f"{path}/{item_id}")).status_code == 200
+        assert (await client.get(f"{path}/{item_id}")).status_code == 404
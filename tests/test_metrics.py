@@ -0,0 +1,47 @@
+import pytest
+from starlette.routing import Route
+
+from conftest import create_nouns
+from metrics import Histogram, _route_label
+
+
+def endpoint(request):
+    pass
+
+
+@pytest.mark.parametrize("path, label", [
+    ("/nounvalue/nounvalue/N_0001", "/nounvalue/nounvalue/{item_id}"),
+    # An ID that equals a literal segment of the path
+    ("/nounvalue/nounvalue/nounvalue", "/nounvalue/nounvalue/{item_id}"),
+    ("/nounvalue/nounvalue/{item_id}", "/nounvalue/nounvalue/{item_id}"),
+])
+def test_route_label_is_the_template_behind_the_router_prefix(path, label):
+    # As included with prefix="/nounvalue", the route only knows its own path
+    route = Route("/nounvalue/{item_id}", endpoint)
+    assert _route_label({"route": route, "path": path}) == label
+
+
+def test_route_label_without_a_route():
+    assert _route_label({"path": "/wp-login.php"}) == "unmatched"
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(("/a",), value)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+@pytest.mark.anyio
+async def test_requests_are_recorded_per_route_template(client):
+    [noun_id] = await create_nouns(client, "Bolt")
+    await client.get(f"/nounvalue/nounvalue/{noun_id}")
+    await client.get("/nounvalue/nounvalue/nounvalue")
+    metrics = (await client.get("/metrics")).text
+    assert 'route="/nounvalue/nounvalue/{item_id}",status="200"' in metrics
+    assert 'route="/nounvalue/nounvalue/{item_id}",status="404"' in metrics
+    assert noun_id not in metrics
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import push
+from changes import Change
+from conftest import create_nouns
+
+
+def change(table: str = "noun_value_mstr", change_id: int = 1) -> Change:
+    return Change(table=table, id=f"N_{change_id:04d}", operation="create", version=change_id,
+                  token=f"100-{change_id}", changed_at=datetime.now(timezone.utc), data={})
+
+
+@pytest.mark.anyio
+async def test_subscribers_only_get_their_tables():
+    subscriber = push.Subscriber(["modifier_name_mstr"])
+    subscriber.offer(change("noun_value_mstr"))
+    subscriber.offer(change("modifier_name_mstr"))
+    assert subscriber.queue.qsize() == 1 and subscriber.queue.get_nowait().table == "modifier_name_mstr"
+
+
+@pytest.mark.anyio
+async def test_a_subscriber_that_falls_behind_is_closed(monkeypatch):
+    monkeypatch.setattr(push, "PUSH_QUEUE_SIZE", 2)
+    subscriber = push.Subscriber(None)
+    for change_id in range(1, 5):
+        subscriber.offer(change(change_id=change_id))
+    assert subscriber.overflowed
+    # The oldest event made room for the end-of-stream marker, and nothing was queued after it
+    assert subscriber.queue.get_nowait().token == "100-2" and subscriber.queue.get_nowait() is None
+    assert subscriber.queue.empty()
+
+
+@pytest.mark.anyio
+async def test_stream_ends_when_the_hub_disconnects_everyone(monkeypatch):
+    hub = push.ChangeHub()
+    monkeypatch.setattr(hub, "start", lambda: None)
+    monkeypatch.setattr(push, "hub", hub)
+    subscriber = hub.subscribe(None)
+    subscriber.offer(change())
+    hub.disconnect_all()
+    events = [event async for event in push._stream(subscriber, None, None)]
+    assert events[0] == ": connected\n\n"
+    assert events[1].startswith("id: 100-1\nevent: create\n") and len(events) == 2
+    assert not hub.subscribers
+
+
+@pytest.mark.anyio
+async def test_stream_replays_the_changes_since_the_token(client):
+    since = (await client.get("/changes")).json()["next_since"]
+    [noun_id] = await create_nouns(client, "Bolt")
+
+    # The test client returns the response once the stream ends
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.5, push.hub.disconnect_all)
+    response = await client.get("/changes/stream", params={"since": since})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block.startswith("id: ")]
+    assert len(events) == 1
+    _, name, data = events[0].split("\n")
+    assert name == "event: create" and json.loads(data.removeprefix("data: "))["id"] == noun_id
@@ -0,0 +1,119 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+
+import database
+import replicas
+import versioning
+from conftest import TEST_DATABASE_URL, create_nouns
+
+
+def request(headers=()) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(k.encode(), v.encode())
+                                                                              for k, v in headers]})
+
+
+def test_reads_rotate_over_the_healthy_replicas(monkeypatch):
+    first, down, second = (SimpleNamespace(healthy=healthy) for healthy in (True, False, True))
+    monkeypatch.setattr(replicas, "replicas", [first, down, second])
+    picked = [replicas._pick_replica(request()) for _ in range(4)]
+    # SimpleNamespaces with equal attributes compare equal, so count by identity
+    assert [id(replica) for replica in picked].count(id(first)) == 2
+    assert [id(replica) for replica in picked].count(id(second)) == 2
+    down.healthy = first.healthy = second.healthy = False
+    assert replicas._pick_replica(request()) is None
+
+
+def test_a_client_that_just_wrote_reads_from_the_primary(monkeypatch):
+    monkeypatch.setattr(replicas, "replicas", [SimpleNamespace(healthy=True)])
+    soon, past = f"{time.time() + 5:.3f}", f"{time.time() - 5:.3f}"
+    assert replicas._pick_replica(request([(replicas.READ_PRIMARY_HEADER, soon)])) is None
+    assert replicas._pick_replica(request([("cookie", f"{replicas.READ_PRIMARY_COOKIE}={soon}")])) is None
+    assert replicas._pick_replica(request([(replicas.READ_PRIMARY_HEADER, past)])) is not None
+    assert replicas._pick_replica(request([(replicas.READ_PRIMARY_HEADER, "soon")])) is not None
+
+
+@pytest.mark.anyio
+async def test_writes_send_the_client_to_the_primary_but_lookups_do_not(client):
+    # The test database stands in for a replica; it is not in recovery, so it has no lag
+    replica = replicas.Replica("replica0", TEST_DATABASE_URL)
+    replicas.replicas.append(replica)
+    try:
+        await replica.check()
+        assert replica.healthy and replica.lag == 0
+
+        [noun_id] = await create_nouns(client, "Bolt")
+        response = await client.post("/nounvalue/nounvalue", json={"noun": "Nut", "abbreviation": "NUT",
+                                                                   "description": "Hex nut", "isActive": True})
+        assert float(response.headers[replicas.READ_PRIMARY_HEADER]) > time.time()
+        assert replicas.READ_PRIMARY_COOKIE in response.cookies
+
+        response = await client.post("/nounvalue/nounvalue/lookup", json={"ids": [noun_id]})
+        assert response.status_code == 200 and replicas.READ_PRIMARY_HEADER not in response.headers
+        response = await client.get(f"/nounvalue/nounvalue/{noun_id}")
+        assert response.status_code == 200 and replicas.READ_PRIMARY_HEADER not in response.headers
+    finally:
+        await replicas.dispose_replicas()
+
+
+async def lagging_replica_url() -> str:
+    """A second database standing in for a replica that has not replayed any write to noun_value_mstr yet."""
+    url = make_url(TEST_DATABASE_URL).set(database="material_test_replica")
+    admin = create_async_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            exists = (await conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                         {"name": url.database})).first()
+            if exists is None:
+                await conn.execute(text(f"CREATE DATABASE {url.database}"))
+        async with database.init_engine().connect() as conn:
+            version = await versioning.read_version(conn, "noun_value_mstr")
+    finally:
+        await admin.dispose()
+    replica = create_async_engine(url)
+    try:
+        async with replica.begin() as conn:
+            await conn.execute(text(versioning.ENSURE_VERSION_TABLE))
+            await conn.execute(text("DROP TABLE IF EXISTS noun_value_mstr"))
+            await conn.execute(text("""
+                CREATE TABLE noun_value_mstr (
+                    noun_id VARCHAR PRIMARY KEY, noun VARCHAR, abbreviation VARCHAR, description VARCHAR,
+                    isActive BOOLEAN
+                )
+            """))
+            await conn.execute(text("""
+                INSERT INTO master_table_versions VALUES ('noun_value_mstr', :version)
+                ON CONFLICT (table_name) DO UPDATE SET version = :version
+            """), {"version": version})
+    finally:
+        await replica.dispose()
+    return url.render_as_string(hide_password=False)
+
+
+@pytest.mark.anyio
+async def test_a_client_that_just_wrote_sees_its_write_despite_a_lagging_replica(client):
+    replica = replicas.Replica("replica0", await lagging_replica_url())
+    replicas.replicas.append(replica)
+    try:
+        before = await client.get("/nounvalue/nounvalue")
+        [noun_id] = await create_nouns(client, "Bolt")
+        assert replicas.READ_PRIMARY_COOKIE in client.cookies
+
+        # Another client reads through the replica, which still has the version and rows from before the write
+        from main import app
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as other:
+            assert (await other.get("/nounvalue/nounvalue")).json()["data"] == []
+            assert (await other.get(f"/nounvalue/nounvalue/{noun_id}")).status_code == 404
+
+        # The writer's cookie sends it to the primary, past the version and pages the replica left behind
+        page = await client.get("/nounvalue/nounvalue", headers={"if-none-match": before.headers["etag"]})
+        assert page.status_code == 200 and [item["noun_id"] for item in page.json()["data"]] == [noun_id]
+        assert (await client.get(f"/nounvalue/nounvalue/{noun_id}")).status_code == 200
+    finally:
+        await replicas.dispose_replicas()
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import database
+import search
+from conftest import create_nouns
+
+
+@pytest.mark.anyio
+async def test_index_build_retries_while_the_database_is_unreachable(monkeypatch):
+    attempts = []
+
+    async def unreachable():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionRefusedError("connection refused")
+        return False
+
+    monkeypatch.setattr(search, "SEARCH_CREATE_INDEXES", True)
+    monkeypatch.setattr(search, "SEARCH_INDEX_RETRY_SECONDS", 0)
+    monkeypatch.setattr(search, "_trigram_available", unreachable)
+    await asyncio.wait_for(search.ensure_search_indexes(), 5)
+    assert len(attempts) == 3
+
+
+def test_prefix_matches_rank_first_in_every_table_query():
+    sql = search.TableSearch("noun_value_mstr", "noun_id", "noun").select(trigram=False, active_filter=True)
+    assert "ORDER BY prefix_match DESC, score DESC, noun_id" in sql
+    assert "isActive = :is_active" in sql
+
+
+@pytest.mark.anyio
+async def test_search_finds_prefixes_across_tables(client):
+    await create_nouns(client, "Bolt", "Nut", "Bolster")
+    response = await client.get("/search", params={"q": "bol", "tables": ["noun_value_mstr"]})
+    assert sorted(item["name"] for item in response.json()["data"]) == ["Bolster", "Bolt"]
+    assert (await client.get("/search", params={"q": "bol", "tables": ["prices"]})).status_code == 400
+    one_table = (await client.get("/nounvalue/nounvalue/search", params={"q": "nu"})).json()["data"]
+    assert [item["name"] for item in one_table] == ["Nut"]
+
+
+@pytest.mark.anyio
+async def test_search_falls_back_to_prefixes_while_the_check_fails(client, monkeypatch):
+    await create_nouns(client, "Bolt")
+    engine = database.build_engine("postgresql+asyncpg://postgres@127.0.0.1:1/postgres", "unreachable", 1, 0)
+    # Only the pg_trgm check goes to the unreachable engine; the search itself uses the request's session
+    monkeypatch.setattr(search, "_trigram", None)
+    monkeypatch.setattr(search.database, "init_engine", lambda: engine)
+    try:
+        response = await client.get("/nounvalue/nounvalue/search", params={"q": "Bol"})
+    finally:
+        await engine.dispose()
+    assert response.status_code == 200 and [r["name"] for r in response.json()["data"]] == ["Bolt"]
+    # Checked again on the next search
+    assert search._trigram is None
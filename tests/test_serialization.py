@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+import cache
+import master_router
+from conftest import create_nouns
+from listing import KeysetLister
+from serialization import RawJSONResponse, as_response, dumps
+
+
+def test_dumps_matches_fastapi_json():
+    value = {"message": "success", "data": [{"noun": "Écrou", "isActive": True, "n": 1.5}], "next_cursor": None}
+    assert dumps(value) == JSONResponse(value).body
+    assert json.loads(dumps(value)) == value
+
+
+def test_as_response_wraps_bytes_and_keeps_the_handlers_headers():
+    response = Response()
+    response.headers["etag"] = 'W/"noun_value_mstr-3"'
+    raw = as_response(b'{"a":1}', response)
+    assert isinstance(raw, RawJSONResponse)
+    assert raw.headers["etag"] == 'W/"noun_value_mstr-3"'
+    assert raw.headers["content-length"] == "7"
+    assert as_response({"a": 1}) == {"a": 1}
+
+
+def test_row_mapper_matches_to_item():
+    lister = KeysetLister("noun_value_mstr", "noun_id", "noun")
+    mapper = lister.row_mapper(("noun_id", "description", "isActive"))
+    assert mapper(("N_0001", None, None)) == {"noun_id": "N_0001", "description": "", "isActive": True}
+    assert mapper(("N_0002", "hex", False)) == {"noun_id": "N_0002", "description": "hex", "isActive": False}
+    assert lister.row_mapper(("noun_id", "description", "isActive")) is mapper
+
+
+@pytest.mark.anyio
+async def test_fast_json_list_pages_are_the_same_json(client, monkeypatch):
+    await create_nouns(client, "Bolt", "Écrou")
+    await create_nouns(client, "Nut", description="")
+    query = {"limit": 2, "fields": "noun,description"}
+    models = (await client.get("/nounvalue/nounvalue", params=query)).json()
+    monkeypatch.setattr(master_router, "FAST_JSON", True)
+    cache.get_cache("noun_value_mstr").clear()
+    assert (await client.get("/nounvalue/nounvalue", params=query)).json() == models
@@ -0,0 +1,18 @@
+import pytest
+
+from server import plan_pools
+
+
+def test_budget_is_split_between_workers_jobs_and_overflow():
+    # 25 per worker: 2 job connections, 1 push listener, 22 for requests
+    assert plan_pools(200, 8, job_workers=2) == {
+        "DB_POOL_SIZE": "14", "DB_MAX_OVERFLOW": "8", "REPLICA_POOL_SIZE": "16", "REPLICA_MAX_OVERFLOW": "9",
+    }
+    assert plan_pools(4, 1, job_workers=2) == {
+        "DB_POOL_SIZE": "1", "DB_MAX_OVERFLOW": "0", "REPLICA_POOL_SIZE": "2", "REPLICA_MAX_OVERFLOW": "2",
+    }
+
+
+def test_budget_too_small_for_the_workers():
+    with pytest.raises(SystemExit, match="at least 4 connections"):
+        plan_pools(30, 10, job_workers=2)
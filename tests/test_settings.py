@@ -0,0 +1,15 @@
+import pytest
+
+from settings import env_bool
+
+
+@pytest.mark.parametrize("value, expected", [("1", True), ("TRUE", True), (" yes ", True), ("on", True),
+                                             ("0", False), ("false", False), ("", False), ("enabled", False)])
+def test_env_bool(monkeypatch, value, expected):
+    monkeypatch.setenv("SOME_FLAG", value)
+    assert env_bool("SOME_FLAG", "false") is expected
+
+
+def test_env_bool_default(monkeypatch):
+    monkeypatch.delenv("SOME_FLAG", raising=False)
+    assert env_bool("SOME_FLAG", "true") is True
@@ -0,0 +1,111 @@
+import itertools
+
+import pytest
+from sqlalchemy import text
+
+import database
+import snapshot
+from listing import KeysetLister, ListParams
+from snapshot import TableSnapshot, snapshots
+
+lister = KeysetLister("noun_value_mstr", "noun_id", "noun")
+
+# IDs in order; NULL names, abbreviations and flags included, as SQL treats them differently
+ROWS = [
+    ("N_0001", "Bolt", "BOL", "Hex bolt", True),
+    ("N_0002", "Bolster", None, None, False),
+    ("N_0003", None, "NUT", "Nameless", None),
+    ("N_0004", "Bo%lt", "B_L", "Wildcards", True),
+    ("N_0005", "Nut", "NUT", "Hex nut", True),
+    ("N_0006", "bolt", "bol", "Lower case", False),
+    ("N_0007", "Washer", "WAS", "Flat washer", True),
+]
+
+
+def params(**overrides) -> ListParams:
+    values = dict(after=None, limit=100, isActive=None, name=None, abbreviation=None, fields=None)
+    values.update(overrides)
+    return ListParams(**values)
+
+
+# Every combination of cursor, page size and filters over ROWS
+COMBINATIONS = [
+    params(after=after, limit=limit, isActive=is_active, name=name, abbreviation=abbreviation, fields=fields)
+    for after, limit, is_active, name, abbreviation, fields in itertools.product(
+        (None, "N_0001", "N_0004", "N_0007"), (1, 2, 100), (None, True, False), (None, "Bo", "Bo%", "bo"),
+        (None, "NUT", "B_"), (None, "noun,isActive"))
+]
+
+
+def test_item_and_page_fill_nulls_like_the_api():
+    table = TableSnapshot(lister, 3, ROWS)
+    assert table.item("N_0003") == {"noun_id": "N_0003", "noun": "", "abbreviation": "NUT",
+                                    "description": "Nameless", "isActive": True}
+    assert table.item("N_9999") is None
+    page = table.page(params(name="Bo", limit=1))
+    assert [item["noun_id"] for item in page["data"]] == ["N_0001"] and page["next_cursor"] == "N_0001"
+    # NULL matches neither isActive filter, as in SQL
+    assert "N_0003" not in [item["noun_id"] for item in table.page(params(isActive=False))["data"]]
+
+
+def test_a_cursor_the_snapshot_does_not_know_goes_to_postgres():
+    assert TableSnapshot(lister, 3, ROWS).page(params(after="N_0003a")) is None
+
+
+def test_repeated_strings_are_stored_once():
+    table = TableSnapshot(lister, 3, ROWS)
+    assert table.abbreviations[2] is table.abbreviations[4]
+
+
+@pytest.mark.anyio
+async def test_snapshot_pages_match_the_list_query(client):
+    async with database.init_engine().begin() as conn:
+        await conn.execute(text("INSERT INTO noun_value_mstr VALUES (:id, :name, :abbreviation, :description, :active)"),
+                           [dict(zip(("id", "name", "abbreviation", "description", "active"), row)) for row in ROWS])
+    table = await snapshots._load(lister)
+    assert len(table) == len(ROWS)
+    async with database.SessionLocal() as db:
+        for case in COMBINATIONS:
+            assert table.page(case) == (await lister.fetch_page(db, case)).model_dump(), case
+
+
+@pytest.mark.anyio
+async def test_list_and_detail_reads_are_served_from_the_snapshot(client, monkeypatch):
+    await client.post("/nounvalue/nounvalue/bulk", json=[
+        {"noun": name, "abbreviation": name[:3].upper(), "description": name, "isActive": True}
+        for name in ("Bolt", "Nut", "Washer")])
+    from_postgres = (await client.get("/nounvalue/nounvalue", params={"limit": 2})).json()
+
+    monkeypatch.setattr(snapshot, "SNAPSHOT_ENABLED", True)
+    await snapshots.load_all()
+    try:
+        # With the table gone from Postgres, only the snapshot can answer
+        async with database.init_engine().begin() as conn:
+            await conn.execute(text("ALTER TABLE noun_value_mstr RENAME TO noun_value_mstr_hidden"))
+        try:
+            response = await client.get("/nounvalue/nounvalue", params={"limit": 2, "name": "N"})
+            assert response.json()["data"][0]["noun"] == "Nut"
+            item_id = from_postgres["data"][0]["noun_id"]
+            assert (await client.get(f"/nounvalue/nounvalue/{item_id}")).json()["data"][0]["noun"] == "Bolt"
+        finally:
+            async with database.init_engine().begin() as conn:
+                await conn.execute(text("ALTER TABLE noun_value_mstr_hidden RENAME TO noun_value_mstr"))
+    finally:
+        await snapshots.close()
+
+
+@pytest.mark.anyio
+async def test_a_rebuild_that_cannot_reach_the_database_keeps_the_old_snapshot(monkeypatch, caplog):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_ENABLED", True)
+    store = snapshot.SnapshotStore()
+    store.register(lister)
+    old = store.snapshots[lister.table] = TableSnapshot(lister, 3, ROWS)
+
+    async def unreachable(lister):
+        raise ConnectionRefusedError("Connection refused")
+
+    monkeypatch.setattr(store, "_load", unreachable)
+    store.refresh(lister.table)
+    await store._loading[lister.table]
+    assert store.snapshots[lister.table] is old and not store._loading
+    assert "Could not load the snapshot" in caplog.text
@@ -0,0 +1,18 @@
+import pytest
+
+from conftest import create_nouns
+
+
+@pytest.mark.anyio
+async def test_update_changes_only_the_given_fields(client):
+    [noun_id] = await create_nouns(client, "Bolt")
+    response = await client.patch(f"/nounvalue/nounvalue/{noun_id}", json={"description": "M8 hex", "isActive": False})
+    assert response.status_code == 200
+    assert response.json()["data"][0] == {"noun_id": noun_id, "noun": "Bolt", "abbreviation": "BOL",
+                                          "description": "M8 hex", "isActive": False}
+
+
+@pytest.mark.anyio
+async def test_update_and_delete_of_a_missing_row_are_404(client):
+    assert (await client.patch("/nounvalue/nounvalue/N_9999", json={"noun": "Nut"})).status_code == 404
+    assert (await client.delete("/nounvalue/nounvalue/N_9999")).status_code == 404
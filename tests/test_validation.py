@@ -0,0 +1,51 @@
+import pytest
+
+import validation
+from conftest import create_nouns
+
+
+async def create_modifier(client, name: str, **fields) -> str:
+    body = {"modifier": name, "abbreviation": name[:3].upper(), "description": f"{name} description", "isActive": True}
+    body.update(fields)
+    response = await client.post("/modifiers/modifiers", json=body)
+    return response.json()["data"][0]["modifier_id"]
+
+
+@pytest.mark.anyio
+async def test_each_problem_is_reported_per_record_and_field(client):
+    [bolt] = await create_nouns(client, "Bolt")
+    [old] = await create_nouns(client, "Rivet", isActive=False)
+    hex_id = await create_modifier(client, "Hex")
+    records = [
+        {"noun": bolt, "modifier": hex_id},
+        {"noun": "N_9999"},
+        {"noun": old, "modifier": "M_9999"},
+        {"noun": bolt, "attribute_name": "M_0001"},
+    ]
+    body = (await client.post("/materials/validate", json={"records": records})).json()
+    assert (body["valid"], body["invalid"]) == (1, 3)
+    assert [(e["index"], e["field"], e["error"]) for e in body["errors"]] == [
+        (1, "noun", "not found"),
+        (2, "noun", "inactive"),
+        (2, "modifier", "not found"),
+        (3, "attribute_name", "modifier is required with attribute_name"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_check_links_requires_a_link_to_the_level_above(client):
+    bolt, nut = await create_nouns(client, "Bolt", "Nut")
+    hex_id = await create_modifier(client, "Hex")
+    await client.post("/hierarchy/links", json={"level": "modifier", "parent_id": bolt, "child_ids": [hex_id]})
+    records = {"records": [{"noun": bolt, "modifier": hex_id}, {"noun": nut, "modifier": hex_id}]}
+
+    assert (await client.post("/materials/validate", json=records)).json()["invalid"] == 0
+    body = (await client.post("/materials/validate", params={"check_links": "true"}, json=records)).json()
+    assert [(e["index"], e["error"]) for e in body["errors"]] == [(1, f"not linked to noun {nut}")]
+
+
+@pytest.mark.anyio
+async def test_oversized_batches_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(validation, "VALIDATE_MAX_RECORDS", 1)
+    response = await client.post("/materials/validate", json={"records": [{"noun": "N_0001"}, {"noun": "N_0002"}]})
+    assert response.status_code == 400
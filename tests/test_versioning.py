@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import create_nouns
+from versioning import _matches, etag_for
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    ('W/"noun_value_mstr-7"', True),
+    ('"noun_value_mstr-7"', True),
+    ('W/"other-1", W/"noun_value_mstr-7"', True),
+    (' * ', True),
+    ('W/"noun_value_mstr-6"', False),
+    ('W/"noun_value_mstr-70"', False),
+    ('', False),
+])
+def test_if_none_match_uses_weak_comparison(if_none_match, matches):
+    assert _matches(if_none_match, etag_for("noun_value_mstr", 7)) is matches
+
+
+@pytest.mark.anyio
+async def test_matching_etag_gets_304_until_the_table_changes(client):
+    [noun_id] = await create_nouns(client, "Bolt")
+    for path in ("/nounvalue/nounvalue", f"/nounvalue/nounvalue/{noun_id}"):
+        first = await client.get(path)
+        etag = first.headers["etag"]
+        cached = await client.get(path, headers={"if-none-match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        assert cached.headers["etag"] == etag
+    await create_nouns(client, "Nut")
+    changed = await client.get("/nounvalue/nounvalue", headers={"if-none-match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
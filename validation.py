@@ -0,0 +1,140 @@
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import ARRAY, String, bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hierarchy import LEVELS, LINKS_TABLE, ensure_links_table
+from metrics import TimedRoute
+from replicas import get_read_db, read_only
+
+# Largest batch accepted by POST /materials/validate
+VALIDATE_MAX_RECORDS = int(os.getenv("VALIDATE_MAX_RECORDS", "100000"))
+
+# Existence and active flag of every distinct ID of a level, one query per level
+_ACTIVE_QUERIES = {
+    level.name: text(f"""
+        SELECT {level.id_field}, COALESCE(isActive, TRUE)
+        FROM {level.table}
+        WHERE {level.id_field} = ANY(CAST(:ids AS TEXT[]))
+    """).bindparams(bindparam("ids", type_=ARRAY(String())))
+    for level in LEVELS
+}
+
+# Which of the given (parent, child) pairs of a level are linked
+_LINK_QUERY = text(f"""
+    SELECT parent_id, child_id
+    FROM {LINKS_TABLE}
+    WHERE child_table = :child_table
+      AND (parent_id, child_id) IN (
+          SELECT * FROM unnest(CAST(:parents AS TEXT[]), CAST(:children AS TEXT[]))
+      )
+""").bindparams(
+    bindparam("child_table", type_=String()), bindparam("parents", type_=ARRAY(String())),
+    bindparam("children", type_=ARRAY(String())),
+).columns(parent_id=String(), child_id=String())
+
+
+class MaterialRecord(BaseModel):
+    """IDs a material record refers to; the levels below the noun are optional."""
+    noun: str
+    modifier: Optional[str] = None
+    attribute_name: Optional[str] = None
+    attribute_value: Optional[str] = None
+
+
+class ValidationRequest(BaseModel):
+    records: List[MaterialRecord]
+
+
+class RecordError(BaseModel):
+    index: int
+    field: str
+    id: Optional[str] = None
+    error: str
+
+
+class ValidationResponse(BaseModel):
+    message: str
+    valid: int
+    invalid: int
+    # In record order; a record can have several
+    errors: List[RecordError]
+
+
+router = APIRouter(route_class=TimedRoute)
+
+
+async def _active_ids(db: AsyncSession, records: List[MaterialRecord]) -> Dict[str, Dict[str, bool]]:
+    active = {}
+    for level in LEVELS:
+        ids = list({getattr(record, level.name) for record in records} - {None})
+        if ids:
+            result = await db.execute(_ACTIVE_QUERIES[level.name], {"ids": ids})
+            active[level.name] = dict(result.fetchall())
+        else:
+            active[level.name] = {}
+    return active
+
+
+async def _linked_pairs(db: AsyncSession, records: List[MaterialRecord]) -> Dict[str, Set[Tuple[str, str]]]:
+    await ensure_links_table()
+    linked = {}
+    for parent, child in zip(LEVELS, LEVELS[1:]):
+        pairs = list({(getattr(record, parent.name), getattr(record, child.name)) for record in records
+                      if getattr(record, parent.name) is not None and getattr(record, child.name) is not None})
+        linked[child.name] = set()
+        if pairs:
+            result = await db.execute(_LINK_QUERY, {
+                "child_table": child.table, "parents": [p for p, _ in pairs], "children": [c for _, c in pairs],
+            })
+            linked[child.name] = set(result.fetchall())
+    return linked
+
+
+# Checks a batch of material records: every referenced noun, modifier,
+# attribute name and value must exist and be active, and with
+# check_links=true each must be linked to the level above in the hierarchy.
+# A fixed number of queries per batch, whatever its size.
+@router.post("/materials/validate", response_model=ValidationResponse, dependencies=[Depends(read_only)])
+async def validate_materials(
+    batch: ValidationRequest,
+    check_links: bool = Query(False),
+    db: AsyncSession = Depends(get_read_db)
+):
+    records = batch.records
+    if len(records) > VALIDATE_MAX_RECORDS:
+        raise HTTPException(status_code=400, detail=f"At most {VALIDATE_MAX_RECORDS} records per batch.")
+    try:
+        active = await _active_ids(db, records)
+        linked = await _linked_pairs(db, records) if check_links else None
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    errors: List[RecordError] = []
+    invalid = 0
+    for index, record in enumerate(records):
+        before = len(errors)
+        for i, level in enumerate(LEVELS):
+            value = getattr(record, level.name)
+            parent = LEVELS[i - 1] if i else None
+            if value is None:
+                continue
+            if parent is not None and getattr(record, parent.name) is None:
+                errors.append(RecordError(index=index, field=level.name, id=value,
+                                          error=f"{parent.name} is required with {level.name}"))
+                continue
+            if value not in active[level.name]:
+                errors.append(RecordError(index=index, field=level.name, id=value, error="not found"))
+            elif not active[level.name][value]:
+                errors.append(RecordError(index=index, field=level.name, id=value, error="inactive"))
+            elif linked is not None and parent is not None \
+                    and (getattr(record, parent.name), value) not in linked[level.name]:
+                errors.append(RecordError(index=index, field=level.name, id=value,
+                                          error=f"not linked to {parent.name} {getattr(record, parent.name)}"))
+        if len(errors) > before:
+            invalid += 1
+    return ValidationResponse(message="success", valid=len(records) - invalid, invalid=invalid, errors=errors)
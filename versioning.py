@@ -0,0 +1,132 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from fastapi import Request, Response
+from sqlalchemy import BigInteger, String, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+
+# How long a worker trusts the version it last read before asking Postgres again.
+# Writes made by this worker are seen immediately; other workers' writes within this window.
+# Clients that just wrote ask again every time (see get_version's ``fresh``).
+TABLE_VERSION_TTL_SECONDS = float(os.getenv("TABLE_VERSION_TTL_SECONDS", "1"))
+
+# One row per master table, bumped in the same transaction as every write, so
+# all workers agree on the current version of a table.
+ENSURE_VERSION_TABLE = """
+    DO $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('master_table_versions'));
+        CREATE TABLE IF NOT EXISTS master_table_versions (
+            table_name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL
+        );
+    END $$;
+"""
+
+GET_TABLE_VERSION = """
+    SELECT version
+    FROM master_table_versions
+    WHERE table_name = :table_name;
+"""
+
+BUMP_TABLE_VERSION = """
+    INSERT INTO master_table_versions (table_name, version)
+    VALUES (:table_name, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = master_table_versions.version + 1
+    RETURNING version;
+"""
+
+_get_table_version = text(GET_TABLE_VERSION).bindparams(bindparam("table_name", type_=String())) \
+    .columns(version=BigInteger())
+_bump_table_version = text(BUMP_TABLE_VERSION).bindparams(bindparam("table_name", type_=String())) \
+    .columns(version=BigInteger())
+
+_ready = False
+# Keyed by table and engine: a replica can be behind the primary, and the
+# version it reports must not be taken for the primary's
+_versions: Dict[Tuple[str, Any], Tuple[float, int]] = {}
+# Counts local writes per table, so a version read that raced with a write is not kept
+_writes: Dict[str, int] = {}
+
+
+async def _ensure_version_table():
+    global _ready
+    if not _ready:
+        async with database.init_engine().begin() as conn:
+            await conn.execute(text(ENSURE_VERSION_TABLE))
+        _ready = True
+
+
+async def read_version(db: AsyncSession, table: str) -> int:
+    """The current version, always read from Postgres (e.g. in the transaction that loads a snapshot)."""
+    await _ensure_version_table()
+    result = await db.execute(_get_table_version, {"table_name": table})
+    return result.scalar() or 0
+
+
+async def get_version(db: AsyncSession, table: str, fresh: bool = False) -> int:
+    """The version of ``table`` in the database ``db`` reads from.
+
+    ``fresh`` skips the memoized version, for clients reading from the
+    primary so that they see their own writes.
+    """
+    key = (table, db.bind)
+    cached = _versions.get(key)
+    if not fresh and cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    writes = _writes.get(table, 0)
+    version = await read_version(db, table)
+    if _writes.get(table, 0) == writes:
+        _versions[key] = (time.monotonic() + TABLE_VERSION_TTL_SECONDS, version)
+    return version
+
+
+async def bump_version(db: AsyncSession, table: str) -> int:
+    """Marks a table as changed; call before committing the write."""
+    await _ensure_version_table()
+    result = await db.execute(_bump_table_version, {"table_name": table})
+    return result.scalar()
+
+
+def forget_version(table: str):
+    """Drops the locally known version; call after committing a write."""
+    _writes[table] = _writes.get(table, 0) + 1
+    for key in [key for key in _versions if key[0] == table]:
+        del _versions[key]
+
+
+def etag_for(table: str, version: Union[int, str]) -> str:
+    return f'W/"{table}-{version}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def not_modified_response(request: Request, response: Response, table: str,
+                          version: Union[int, str]) -> Optional[Response]:
+    """Returns a 304 response when the client already has this version.
+
+    Otherwise sets the ETag on the outgoing response and returns None, and the
+    handler carries on building the body.
+    """
+    etag = etag_for(table, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None